@@ -3,15 +3,33 @@ import logging
 import uuid  # Used for unique identifier generation
 import base64
 import requests
+from requests.adapters import HTTPAdapter
 import json  # Used for JSON handling
 import time
 import hashlib
+import re
+import io
 import concurrent.futures
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from PIL import Image, ImageOps
 from werkzeug.utils import secure_filename
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
+from scraping.models import Product, encode_value
+from scraping.pricing import normalize_price, sort_by_price, filter_by_price
+from scraping.images import parse_thumb_width, with_thumbnails
+from scraping.ranking import score_products, top_products
+from scraping.facets import compute_facets, parse_filters, filter_products
+from scraping.cache import ResultCache
+from scraping.similarity import ThumbnailFetcher, histogram_from_file, rerank_by_color
+from scraping.wire import ACCEPT_HEADER, decode_response
+
+try:
+    import gevent
+    from gevent import monkey
+except ImportError:  # gevent only runs under gunicorn (see gunicorn.conf.py)
+    gevent = None
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -34,6 +52,58 @@ MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
 ZARA_SCRAPER_URL = os.getenv('ZARA_SCRAPER_URL', 'http://localhost:5002/api/scrape')
 HM_SCRAPER_URL = os.getenv('HM_SCRAPER_URL', 'http://localhost:5003/api/scrape')
 
+# Dictionary of retailers with their URLs
+RETAILERS = {
+    "zara": ZARA_SCRAPER_URL,
+    "hm": HM_SCRAPER_URL
+}
+# Vision response field holding each retailer's search string
+SEARCH_STRING_FIELDS = {
+    "zara_search_string": "zara",
+    "hm_search_string": "hm"
+}
+
+# How many products each scraper returns (0 for all) and which fields;
+# only what the frontend renders is requested
+SCRAPE_RESULT_LIMIT = int(os.getenv('SCRAPE_RESULT_LIMIT', 48))
+SCRAPE_FIELDS = [
+    "name", "price", "price_cents", "currency", "availability", "image_url", "product_url",
+    "attributes.color", "attributes.color_name", "attributes.length", "attributes.material", "attributes.style", "colors",
+    "images"
+]
+
+# min_price and max_price: a non-negative amount in major units, e.g. "25" or "25.50"
+PRICE_OPTION = re.compile(r'^\d+(?:\.\d{1,2})?$')
+
+# Accepted values of the sort option -> whether the price order is descending
+PRICE_SORTS = {"price": False, "-price": True}
+
+# How long merged results stay available to the results endpoint (seconds), and how many are kept
+RESULTS_TTL = int(os.getenv('RESULTS_TTL', 600))
+RESULTS_STORE_SIZE = int(os.getenv('RESULTS_STORE_SIZE', 256))
+# Products per page of results, by default and at most
+RESULTS_PAGE_SIZE = int(os.getenv('RESULTS_PAGE_SIZE', 24))
+RESULTS_MAX_PAGE_SIZE = int(os.getenv('RESULTS_MAX_PAGE_SIZE', 100))
+
+# Outbound HTTP connection pool size (vision API + scraper services)
+OUTBOUND_POOL_SIZE = int(os.getenv('OUTBOUND_POOL_SIZE', 50))
+
+# Image preprocessing before the vision call
+VISION_MAX_EDGE = int(os.getenv('VISION_MAX_EDGE', 768))  # Longest edge in pixels
+VISION_IMAGE_FORMAT = os.getenv('VISION_IMAGE_FORMAT', 'JPEG').upper()  # JPEG or WEBP
+VISION_IMAGE_QUALITY = int(os.getenv('VISION_IMAGE_QUALITY', 80))
+VISION_IMAGE_DETAIL = os.getenv('VISION_IMAGE_DETAIL', '')  # 'low', 'high', 'auto' or empty to omit
+# Seconds to connect to the vision API, and the longest gap between streamed chunks
+VISION_CONNECT_TIMEOUT = float(os.getenv('VISION_CONNECT_TIMEOUT', 10))
+VISION_READ_TIMEOUT = float(os.getenv('VISION_READ_TIMEOUT', 60))
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -45,6 +115,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session so outbound calls (vision API, scrapers and the retailers'
+# image CDNs) reuse pooled keep-alive connections.
+# Under gunicorn's gevent workers (see gunicorn.conf.py) these sockets are
+# cooperative, so waiting on the vision API or a scraper doesn't block other requests.
+http_session = requests.Session()
+http_adapter = HTTPAdapter(pool_connections=len(RETAILERS) * 2 + 1, pool_maxsize=OUTBOUND_POOL_SIZE)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+
+# Bounded concurrent thumbnail downloads for the color rerank
+thumbnail_fetcher = ThumbnailFetcher(http_session)
+
 # Ensure the upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -56,6 +138,10 @@ limiter = Limiter(
     storage_uri="memory://"  # Use Redis in production: "redis://localhost:6379/0"
 )
 
+# Scored results of recent finds by result id. Like the limiter's storage this
+# is process memory, which is why gunicorn.conf.py pins a single worker
+results_store = ResultCache(RESULTS_TTL, RESULTS_STORE_SIZE)
+
 # Function to check allowed file extensions
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -75,15 +161,126 @@ def encode_image(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
-def analyze_clothing_image(image_path):
-    """Analyze clothing in an image using ChatGPT Vision API"""
+def run_blocking(func, *args):
+    """
+    Run CPU-bound work (image decoding, histograms) on a native thread when
+    under gevent workers, so it doesn't stall every other request's greenlet
+    """
+    if gevent is not None and monkey.is_module_patched('threading'):
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+def prepare_image_for_vision(image_path):
+    """
+    Decode, orient, downscale and recompress an uploaded image for the vision API.
+
+    Args:
+        image_path: Path to the uploaded image file
+
+    Returns:
+        Tuple of (base64 string, MIME type). Falls back to the original bytes
+        if the image cannot be decoded.
+    """
+    original_size = os.path.getsize(image_path)
+    try:
+        with Image.open(image_path) as img:
+            # Let the JPEG decoder scale down while decoding instead of after
+            img.draft('RGB', (VISION_MAX_EDGE, VISION_MAX_EDGE))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+
+            image_format = 'WEBP' if VISION_IMAGE_FORMAT == 'WEBP' else 'JPEG'
+            if img.mode not in ('RGB', 'L'):
+                # Flatten transparency onto white so JPEG/WebP encoding works for PNG/GIF uploads
+                rgba = img.convert('RGBA')
+                img = Image.new('RGB', rgba.size, (255, 255, 255))
+                img.paste(rgba, mask=rgba.split()[-1])
+
+            buffer = io.BytesIO()
+            img.save(buffer, format=image_format, quality=VISION_IMAGE_QUALITY, optimize=True)
+            encoded = buffer.getvalue()
+    except Exception as e:
+        logger.warning(f"Could not preprocess image, sending original: {str(e)}")
+        ext = image_path.rsplit('.', 1)[1].lower() if '.' in image_path else ''
+        return encode_image(image_path), IMAGE_MIME_TYPES.get(ext, 'image/jpeg')
+
+    logger.info(f"Prepared image for vision: {original_size} -> {len(encoded)} bytes ({img.size[0]}x{img.size[1]})")
+    return base64.b64encode(encoded).decode('utf-8'), f"image/{image_format.lower()}"
+
+class JsonStringFieldScanner:
+    """
+    Incrementally scan streamed JSON text and report string fields as soon as
+    their value has been fully received.
+
+    Only string values are tracked; nesting is ignored because the field names
+    we watch for are unique within the vision response.
+    """
+
+    def __init__(self, fields, callback):
+        self.fields = set(fields)
+        self.callback = callback
+        self.in_string = False
+        self.escape = False
+        self.buffer = []
+        self.candidate_key = None  # Last completed string, may turn out to be a key
+        self.current_key = None    # Key whose value we are waiting for
+        self.seen = set()
+
+    def feed(self, text):
+        for char in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                    self.buffer.append(char)
+                elif char == '\\':
+                    self.escape = True
+                    self.buffer.append(char)
+                elif char == '"':
+                    self.in_string = False
+                    self._string_complete(''.join(self.buffer))
+                else:
+                    self.buffer.append(char)
+            elif char == '"':
+                self.in_string = True
+                self.buffer = []
+            elif char == ':':
+                self.current_key = self.candidate_key
+                self.candidate_key = None
+            elif not char.isspace():
+                self.current_key = None
+                self.candidate_key = None
+
+    def _string_complete(self, raw):
+        try:
+            value = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            value = raw
+
+        if self.current_key is None:
+            self.candidate_key = value
+            return
+
+        key = self.current_key
+        self.current_key = None
+        if key in self.fields and key not in self.seen:
+            self.seen.add(key)
+            self.callback(key, value)
+
+def analyze_clothing_image(image_path, on_search_string=None):
+    """
+    Analyze clothing in an image using ChatGPT Vision API
+
+    The completion is streamed; if on_search_string is given it is called with
+    (field, value) as soon as zara_search_string or hm_search_string has been
+    fully received, before the rest of the response arrives.
+    """
     # Get API key from environment variable
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         return {"status": False, "error": "OpenAI API key not configured"}
     
-    # Convert image to base64
-    base64_image = encode_image(image_path)
+    # Downscale and convert image to base64
+    base64_image, mime_type = run_blocking(prepare_image_for_vision, image_path)
     
     headers = {
         "Content-Type": "application/json",
@@ -121,6 +318,10 @@ def analyze_clothing_image(image_path):
     }
     """
     
+    image_url = {"url": f"data:{mime_type};base64,{base64_image}"}
+    if VISION_IMAGE_DETAIL:
+        image_url["detail"] = VISION_IMAGE_DETAIL
+
     # Prepare the payload for OpenAI API
     payload = {
         "model": "gpt-4o-mini",
@@ -131,27 +332,51 @@ def analyze_clothing_image(image_path):
                     {"type": "text", "text": prompt},
                     {
                         "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
+                        "image_url": image_url
                     }
                 ]
             }
         ],
-        "max_tokens": 2000
+        "max_tokens": 2000,
+        "stream": True
     }
     
-    # Make the API request
-    response = requests.post(
+    # Make the API request; the with block releases the pooled connection on every path
+    with http_session.post(
         "https://api.openai.com/v1/chat/completions",
         headers=headers,
-        json=payload
-    )
-    
-    # Process the response
+        json=payload,
+        stream=True,
+        timeout=(VISION_CONNECT_TIMEOUT, VISION_READ_TIMEOUT)
+    ) as response:
+        return read_vision_response(response, on_search_string)
+
+def read_vision_response(response, on_search_string=None):
+    """Read the clothing data from a streamed vision API response"""
     if response.status_code == 200:
-        result = response.json()
-        content = result['choices'][0]['message']['content'].strip()
+        scanner = None
+        if on_search_string:
+            scanner = JsonStringFieldScanner(SEARCH_STRING_FIELDS, on_search_string)
+
+        # Read server-sent events, feeding each content delta to the scanner
+        chunks = []
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            try:
+                event = json.loads(data)
+                delta = event['choices'][0]['delta'].get('content') or ''
+            except (json.JSONDecodeError, KeyError, IndexError):
+                continue
+            if delta:
+                chunks.append(delta)
+                if scanner:
+                    scanner.feed(delta)
+
+        content = ''.join(chunks).strip()
         try:
             clothing_data = json.loads(content)
             clothing_data["status"] = True
@@ -162,16 +387,194 @@ def analyze_clothing_image(image_path):
         return {"status": False, "error": f"AI service error: {response.status_code}"}
     
 
+def parse_result_options(values):
+    """
+    Parse the sort, filter, paging and thumbnail options of a results request
+
+    Args:
+        values: The request's query and form values; sort is "price" or
+            "-price" (best matches first otherwise), min_price and max_price
+            are in major units (e.g. "25.50"), retailer, color, length and
+            price filter by facet value, top_k caps how many of the best
+            matches are paged through, limit is the page size, cursor the
+            next_cursor of the previous page and thumb_width is the width in
+            pixels images are shown at
+
+    Returns:
+        Dictionary with sort (None for relevance), min_cents, max_cents,
+        filters, top_k (None for all), limit, offset and thumb_width (None
+        for the default images)
+
+    Raises:
+        ValueError: If an option has an invalid value
+    """
+    sort = values.get('sort') or None
+    if sort is not None and sort not in PRICE_SORTS:
+        raise ValueError(f"Invalid sort: {sort}. Use one of: {', '.join(PRICE_SORTS)}")
+
+    options = {"sort": sort}
+    for name in ('min_price', 'max_price'):
+        value = values.get(name, '').strip()
+        # parse_price would read "-5" as 5 and "1e3" as 1, so only plain amounts are accepted
+        if value and not PRICE_OPTION.match(value):
+            raise ValueError(f"Invalid {name}: {value}. Use a non-negative amount such as 25 or 25.50")
+        cents = normalize_price(value)[0] if value else None
+        options[name.replace('price', 'cents')] = cents
+    if options["min_cents"] is not None and options["max_cents"] is not None and options["min_cents"] > options["max_cents"]:
+        raise ValueError("min_price can't be greater than max_price")
+    options["filters"] = parse_filters(values)
+    top_k = values.get('top_k', '').strip()
+    if top_k and (not top_k.isdigit() or int(top_k) == 0):
+        raise ValueError(f"Invalid top_k: {top_k}")
+    options["top_k"] = int(top_k) if top_k else None
+    limit = values.get('limit', '').strip()
+    if limit and (not limit.isdigit() or not 0 < int(limit) <= RESULTS_MAX_PAGE_SIZE):
+        raise ValueError(f"limit must be between 1 and {RESULTS_MAX_PAGE_SIZE}")
+    options["limit"] = int(limit) if limit else RESULTS_PAGE_SIZE
+    options["offset"] = decode_cursor(values.get('cursor'), options)
+    options["thumb_width"] = parse_thumb_width(values.get('thumb_width'))
+    return options
+
+def ordering_key(options):
+    """Short digest of the options that decide which products are paged through, and in what order"""
+    ordering = [
+        options["sort"], options["min_cents"], options["max_cents"], options["top_k"],
+        sorted((facet, sorted(values)) for facet, values in options["filters"].items())
+    ]
+    return hashlib.sha1(json.dumps(ordering).encode()).hexdigest()[:10]
+
+def encode_cursor(offset, options):
+    """Opaque cursor for the page starting at offset, bound to the options' ordering"""
+    return base64.urlsafe_b64encode(f"{offset}.{ordering_key(options)}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, options):
+    """
+    Offset of the page a cursor points to (0 without a cursor)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for a different
+            sort or filters, whose pages would not line up
+    """
+    if not cursor:
+        return 0
+    try:
+        offset, key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(".")
+        offset = int(offset)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if offset < 0 or key != ordering_key(options):
+        raise ValueError("Cursor doesn't match the sort and filters of this request")
+    return offset
+
+def select_results(items, options):
+    """
+    Select one page of scored products: filter them by price range and
+    facets, order the best top_k matches for the photo (or by price) and
+    size the page's images for the requested thumbnail width
+
+    One pass over the products for the filters and a heap only as deep as
+    the requested page when ranked by relevance. The order only depends on
+    the stored scores and the options, so pages line up across requests.
+
+    Returns:
+        Tuple of (number of matching products, the page's products, offset
+        of the next page or None on the last page)
+    """
+    items = filter_by_price(items, options["min_cents"], options["max_cents"])
+    items = filter_products(items, options["filters"])
+    available = min(len(items), options["top_k"] or len(items))
+    end = min(options["offset"] + options["limit"], available)
+    if options["sort"]:
+        ordered = top_products(items, available)
+        sort_by_price(ordered, descending=PRICE_SORTS[options["sort"]])
+    else:
+        # nlargest's order for a prefix is the same as for the whole list
+        ordered = top_products(items, end)
+    page = ordered[options["offset"]:end]
+    return available, with_thumbnails(page, options["thumb_width"]), end if end < available else None
+
+def results_response(result_id, stored, options):
+    """Body of a find or results response: one page of the stored results, with the facets of them all"""
+    count, items, next_offset = select_results(stored["items"], options)
+    return {
+        "status": True,
+        "result_id": result_id,
+        "query": stored["query"],
+        "total": len(stored["items"]),
+        "count": count,
+        "facets": stored["facets"],
+        "items": items,
+        "next_cursor": encode_cursor(next_offset, options) if next_offset is not None else None
+    }
+
 # @app.route('/')
 # def index():
 #     return app.send_static_file('index.html')
 
-def scrape_multiple_retailers(clothing_data):
+def scrape_retailer(url, retailer_name, clothing_data):
+    """
+    Scrape a single retailer with its own search string
+
+    Args:
+        url: Scraper service endpoint for the retailer
+        retailer_name: Retailer key, e.g. "zara" or "hm"
+        clothing_data: Clothing attributes known so far; may only hold the
+            retailer's search string when dispatched early
+
+    Returns:
+        List of Products tagged with the retailer name
+    """
+    # Prefer the compact msgpack encoding; requests already asks for gzip
+    headers = {"Content-Type": "application/json", "Accept": ACCEPT_HEADER}
+    try:
+        # Copy the clothing data and its attributes so retailers don't overwrite each other
+        retailer_specific_data = clothing_data.copy()
+        retailer_specific_data["attributes"] = dict(retailer_specific_data.get("attributes", {}))
+        
+        # Add a generic search_string that each scraper will use based on the retailer
+        search_field = next(field for field, name in SEARCH_STRING_FIELDS.items() if name == retailer_name)
+        retailer_specific_data["attributes"]["search_string"] = retailer_specific_data["attributes"].get(search_field, "")
+        logger.info(f"Using {retailer_name} search string: {retailer_specific_data['attributes']['search_string']}")
+        
+        # Ask only for the products and fields the results page shows
+        retailer_specific_data["fields"] = SCRAPE_FIELDS
+        if SCRAPE_RESULT_LIMIT:
+            retailer_specific_data["limit"] = SCRAPE_RESULT_LIMIT
+        
+        response = http_session.post(
+            url, 
+            headers=headers, 
+            json=retailer_specific_data,
+            timeout=300
+        )
+        
+        logger.info(f"Response from {retailer_name}: Status {response.status_code}")
+        
+        if response.status_code == 200:
+            result = decode_response(response)
+            
+            # Load each item as a Product tagged with the retailer name
+            if "items" in result and isinstance(result["items"], list):
+                return [
+                    Product.from_dict(item, retailer=retailer_name)
+                    for item in result["items"] if isinstance(item, dict)
+                ]
+        
+        logger.error(f"Error from {retailer_name}: {response.status_code}")
+        return []
+        
+    except Exception as e:
+        logger.error(f"Error scraping {retailer_name}: {str(e)}")
+        return []
+
+def scrape_multiple_retailers(clothing_data, pending=None):
     """
     Scrape products from multiple retailers in parallel
 
     Args:
         clothing_data: Dictionary with clothing attributes to search for
+        pending: Optional dictionary of retailer name -> Future for scrapes
+            already dispatched while the vision response was streaming
 
     Returns:
         Dictionary with combined results from all scrapers
@@ -188,67 +591,14 @@ def scrape_multiple_retailers(clothing_data):
         "query": display_query,
         "items": []
     }
-    print(all_results)
-    
-    headers = {"Content-Type": "application/json"}
-    
-    # Function to scrape a single retailer with the appropriate search string
-    def scrape_retailer(url, retailer_name):
-        try:
-            # Create a copy of the clothing data to modify for each retailer
-            retailer_specific_data = clothing_data.copy()
-            
-            # Make sure attributes are present
-            if "attributes" not in retailer_specific_data:
-                retailer_specific_data["attributes"] = {}
-            
-            # Add a generic search_string that each scraper will use based on the retailer
-            if retailer_name == "zara":
-                retailer_specific_data["attributes"]["search_string"] = retailer_specific_data.get("attributes", {}).get("zara_search_string", "")
-                logger.info(f"Using Zara search string: {retailer_specific_data['attributes']['search_string']}")
-            elif retailer_name == "hm":
-                retailer_specific_data["attributes"]["search_string"] = retailer_specific_data.get("attributes", {}).get("hm_search_string", "")
-                logger.info(f"Using H&M search string: {retailer_specific_data['attributes']['search_string']}")
-            
-            response = requests.post(
-                url, 
-                headers=headers, 
-                json=retailer_specific_data,
-                timeout=300
-            )
-            
-            logger.info(f"Response from {retailer_name}: Status {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Tag each item with the retailer name
-                if "items" in result and isinstance(result["items"], list):
-                    for item in result["items"]:
-                        item["retailer"] = retailer_name
-                    
-                    return result.get("items", [])
-            
-            logger.error(f"Error from {retailer_name}: {response.status_code}")
-            return []
-            
-        except Exception as e:
-            logger.error(f"Error scraping {retailer_name}: {str(e)}")
-            return []
-    
-    # Dictionary of retailers with their URLs
-    retailers = {
-        "zara": ZARA_SCRAPER_URL,
-        "hm": HM_SCRAPER_URL
-    }
     
-    # Use ThreadPoolExecutor to scrape from multiple retailers in parallel
+    # Use ThreadPoolExecutor to scrape the remaining retailers in parallel
     with concurrent.futures.ThreadPoolExecutor() as executor:
-        # Create a future for each retailer
-        future_to_retailer = {
-            executor.submit(scrape_retailer, url, retailer_name): retailer_name 
-            for retailer_name, url in retailers.items()
-        }
+        # Create a future for each retailer that wasn't dispatched early
+        future_to_retailer = {future: retailer_name for retailer_name, future in (pending or {}).items()}
+        for retailer_name, url in RETAILERS.items():
+            if retailer_name not in (pending or {}):
+                future_to_retailer[executor.submit(scrape_retailer, url, retailer_name, clothing_data)] = retailer_name
         
         # Collect results as they complete
         for future in concurrent.futures.as_completed(future_to_retailer):
@@ -285,6 +635,13 @@ def upload_and_find_fashion():
             logger.warning(f"Invalid file type: {file.filename}")
             return jsonify({"status": False, "message": "Invalid file type. Allowed types: png, jpg, jpeg, gif, webp"}), 400
 
+        # Validate sorting, price filters and thumbnail size before doing any work
+        try:
+            result_options = parse_result_options(request.values)
+        except ValueError as option_error:
+            logger.warning(f"Invalid result options: {str(option_error)}")
+            return jsonify({"status": False, "message": str(option_error)}), 400
+
         # Secure and save the file
         original_filename = secure_filename(file.filename)
         unique_filename = generate_unique_filename(original_filename)
@@ -293,9 +650,24 @@ def upload_and_find_fashion():
         file.save(file_path)
         logger.info(f"File saved: {file_path}")
 
+        # Scrapes dispatched while the vision response is still streaming, and
+        # the photo's colors (for reranking results by their thumbnails),
+        # computed off the vision call's critical path
+        early_executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(RETAILERS) + 1)
+        early_scrapes = {}
+        photo_histogram_job = early_executor.submit(run_blocking, histogram_from_file, file_path)
+
+        def dispatch_early_scrape(field, search_string):
+            retailer_name = SEARCH_STRING_FIELDS[field]
+            logger.info(f"Dispatching {retailer_name} scrape early with search string: {search_string}")
+            early_scrapes[retailer_name] = early_executor.submit(
+                scrape_retailer, RETAILERS[retailer_name], retailer_name, {"attributes": {field: search_string}}
+            )
+
         try:
             # Analyze the image to get clothing attributes
-            clothing_data = analyze_clothing_image(file_path)
+            clothing_data = analyze_clothing_image(file_path, on_search_string=dispatch_early_scrape)
+            photo_histogram = photo_histogram_job.result()
             os.remove(file_path)
             
             # print(str(clothing_data))
@@ -304,7 +676,7 @@ def upload_and_find_fashion():
                 # Delete the file on error
                 return jsonify({"status": False, "message": "Failed to analyze image"}), 500
             
-            logger.info(f"Image analysis complete. Clothing attributes: {json.dumps(clothing_data)}")
+            logger.info(f"Image analysis complete: {clothing_data.get('clothing_type', 'unknown')}")
             
             # Send the clothing attributes to the scraper service
             headers = {"Content-Type": "application/json"}
@@ -336,9 +708,19 @@ def upload_and_find_fashion():
             #     }), 500
             # New code: Scrape from multiple retailers in parallel
             logger.info("Starting parallel scraper calls to multiple retailers")
-            scraper_response = scrape_multiple_retailers(clothing_data)
+            scraper_response = scrape_multiple_retailers(clothing_data, pending=early_scrapes)
             logger.info(f"Received combined response with {len(scraper_response.get('items', []))} items")
-            return jsonify(scraper_response), 200
+
+            # Score and count the merged results once; the results endpoint
+            # serves filtered slices of them from the store
+            items = score_products(scraper_response["items"], clothing_data)
+            # Reranking waits on thumbnail downloads, bounded by COLOR_FETCH_BUDGET; it
+            # happens before storing so cursor pages never see scores change
+            items = rerank_by_color(items, photo_histogram, thumbnail_fetcher)
+            stored = {"query": scraper_response["query"], "items": items, "facets": compute_facets(items)}
+            result_id = uuid.uuid4().hex
+            results_store.set(result_id, stored)
+            return Response(encode_value(results_response(result_id, stored, result_options)), mimetype="application/json"), 200
             
         except requests.RequestException as req_error:
             logger.error(f"Error connecting to scraper service: {str(req_error)}")
@@ -360,10 +742,28 @@ def upload_and_find_fashion():
                 "message": f"Error processing image: {str(processing_error)}"
             }), 500
 
+        finally:
+            # Don't hold the response open for early scrapes of a failed analysis
+            early_executor.shutdown(wait=False, cancel_futures=True)
+
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         return jsonify({"status": False, "message": f"An internal error occurred: {str(e)}"}), 500
 
+# Filtered slices of earlier find results
+@app.route('/api/fashion/results/<result_id>', methods=['GET'])
+@limiter.limit("60 per minute")  # Filter clicks are cheap, so allow more than finds
+def get_fashion_results(result_id):
+    try:
+        result_options = parse_result_options(request.args)
+    except ValueError as option_error:
+        return jsonify({"status": False, "message": str(option_error)}), 400
+
+    stored = results_store.get(result_id)
+    if stored is None:
+        return jsonify({"status": False, "message": "Results not found or expired"}), 404
+    return Response(encode_value(results_response(result_id, stored, result_options)), mimetype="application/json"), 200
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
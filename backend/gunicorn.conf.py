@@ -0,0 +1,20 @@
+import os
+
+# The backend spends nearly all of its time waiting on the vision API and the
+# scraper services, so gevent workers let one process keep many
+# find-requests in flight instead of serving them one at a time. The little
+# CPU-bound work (decoding and downscaling the upload, color histograms) goes
+# through app.run_blocking, which hands it to gevent's native thread pool.
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+worker_class = "gevent"
+# One process only: stored results (and their cursors) and the rate limiter
+# live in process memory, so a second worker would 404 follow-up requests.
+# Scale with worker_connections, or by running more containers behind a
+# sticky load balancer.
+workers = 1
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+# Scrapes can still take minutes end to end
+timeout = 300
+graceful_timeout = 30
+keepalive = 5
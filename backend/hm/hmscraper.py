@@ -1,22 +1,16 @@
 import os
-import logging
-import base64
-import io
-import time
+import sys
 import json
+import logging
 import re
-import random
-from flask import Flask, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask_cors import CORS
-from PIL import Image
-from playwright.sync_api import sync_playwright
-
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for cross-service communication
+# The shared scraping engine lives next to this service's directory
+# (and is copied beside it in the container)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraping import (
+    RetailerAdapter, create_app, run_dev_server, make_product, FETCH_NEXT_DATA_JS, build_numbered_page_urls,
+    classify, normalize_price, width_template, width_renditions
+)
 
 # Set up logging
 logging.basicConfig(
@@ -25,195 +19,155 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize Flask-Limiter
-limiter = Limiter(
-    get_remote_address,
-    app=app,
-    default_limits=["300 per day", "60 per hour"],
-    storage_uri="memory://"  # Use Redis in production: "redis://localhost:6379/0"
-)
-
 
 #########################
-# H&M SCRAPER FUNCTIONS
+# H&M ADAPTER
 #########################
 
-def scrape_hm_search_results(search_term):
-    """
-    Scrape H&M for products matching the search term.
-    
-    Args:
-        search_term: The search term to look for (e.g., "black skirt")
-        
-    Returns:
-        A list of product dictionaries
-    """
-    # Create the search URL - using US site
-    search_url = f"https://www2.hm.com/en_us/search-results.html?q={search_term.replace(' ', '%20')}"
-    logger.info(f"Scraping H&M with URL: {search_url}")
-    
-    # Store API responses and products
-    api_responses = []
-    products = []
-    
-    with sync_playwright() as p:
-        # Enhanced browser launch with stealth options
-        browser = p.chromium.launch(
-            headless=True,  # Change to headless=True for production
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--window-size=1440,900'
-            ]
-        )
-        
-        context = browser.new_context(
-            viewport={"width": 1366, "height": 768},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        
-        # Add extra headers to seem more like a real browser
-        context.set_extra_http_headers({
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120"',
-            "sec-ch-ua-platform": '"Windows"',
-            "sec-ch-ua-mobile": "?0",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1"
-        })
-        
-        page = context.new_page()
-        
-        # Add anti-detection script before navigation
-        page.evaluate("""() => {
-            // Override navigator properties to make detection harder
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => false,
-            });
-            
-            // Add missing browser properties
-            window.chrome = {
-                runtime: {},
+# Anti-detection script, run in every page before H&M's own scripts
+HM_STEALTH_JS = """() => {
+    // Override navigator properties to make detection harder
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => false,
+    });
+
+    // Add missing browser properties
+    window.chrome = {
+        runtime: {},
+    };
+
+    // Add language and plugin data
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [
+            {
+                0: {type: "application/x-google-chrome-pdf"},
+                description: "Portable Document Format",
+                name: "Chrome PDF Plugin"
+            }
+        ],
+    });
+
+    // Override permissions
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (parameters) => (
+        parameters.name === 'notifications' ?
+        Promise.resolve({ state: Notification.permission }) :
+        originalQuery(parameters)
+    );
+}"""
+
+# Selectors tried in order for the DOM fallback: product items, then fields within an item
+HM_DOM_SELECTORS = {
+    "items": ["li.product-item", ".product-item", "[data-testid='product-item']", ".product-grid li", ".product-grid article"],
+    "name": [".item-heading a", ".item-heading", "h3", ".product-item-heading"],
+    "price": [".item-price .price-value", ".item-price", ".product-item-price", "[data-testid='product-price']"],
+    "image": ["img.item-image", "img", ".product-item-image img"]
+}
+
+# Read every product item in one round trip: the first item selector that yields
+# products wins, and each item becomes a compact {url, name, price, image} record
+HM_DOM_PRODUCTS_JS = """(selectors) => {
+    const first = (item, list) => {
+        for (const selector of list) {
+            const element = item.querySelector(selector);
+            if (element) return element;
+        }
+        return null;
+    };
+    for (const itemSelector of selectors.items) {
+        const records = [];
+        for (const item of document.querySelectorAll(itemSelector)) {
+            const link = item.querySelector('a');
+            const name = first(item, selectors.name);
+            const price = first(item, selectors.price);
+            const image = first(item, selectors.image);
+            const record = {
+                url: link && link.getAttribute('href') ? link.href : '',
+                name: name ? name.innerText.trim() : '',
+                price: price ? price.innerText.trim() : '',
+                image: image ? (image.getAttribute('data-src') || image.getAttribute('src') || '') : ''
             };
-            
-            // Add language and plugin data
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [
-                    {
-                        0: {type: "application/x-google-chrome-pdf"},
-                        description: "Portable Document Format",
-                        name: "Chrome PDF Plugin"
-                    }
-                ],
-            });
-            
-            // Override permissions
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                Promise.resolve({ state: Notification.permission }) :
-                originalQuery(parameters)
-            );
-        }""")
-        
-        # Set up network request interception to capture API responses
-        def handle_response(response):
-            try:
-                url = response.url
-                if (
-                    ('api' in url.lower() or 'search' in url.lower() or 'product' in url.lower()) and 
-                    (response.status == 200) and
-                    ('json' in response.headers.get('content-type', '').lower())
-                ):
-                    try:
-                        data = response.json()
-                        api_responses.append({
-                            'url': url,
-                            'data': data
-                        })
-                        logger.info(f"Captured API response from: {url}")
-                    except Exception as json_error:
-                        logger.warning(f"Could not parse JSON from {url}: {str(json_error)}")
-            except Exception as resp_error:
-                logger.warning(f"Error handling response: {str(resp_error)}")
-                
-        page.on("response", handle_response)
-        
-        # Navigate to the page with increased timeout
-        logger.info(f"Loading URL: {search_url}")
-        page.goto(search_url, timeout=120000, wait_until="networkidle")
-        logger.info("Page loaded successfully")
-        
-        # Handle cookies if needed
-        try:
-            # First check if there's any cookie banner visible
-            cookie_visible = page.evaluate("""() => {
-                return document.body.innerText.includes('cookie') || 
-                       document.body.innerText.includes('Cookie') ||
-                       document.body.innerText.includes('Accept') ||
-                       document.body.innerText.includes('ACCEPT');
-            }""")
-            
-            if cookie_visible:
-                logger.info("Cookie-related text found on page, attempting to accept...")
-                
-                # Try various cookie selectors
-                cookie_selectors = [
-                    "[data-testid='cookie-accept-all']",
-                    "button:has-text('Accept')", 
-                    "button:has-text('ACCEPT ALL')",
-                    "button:has-text('Accept all')",
-                    ".cookie-accept-button",
-                    "button:has-text('Accept cookies')",
-                    "button:has-text('I accept')",
-                    ".cookie-banner button",
-                    "//button[contains(text(), 'Accept')]",
-                    "//button[contains(text(), 'accept')]"
-                ]
-                
-                # Try clicking elements that look like cookie buttons
-                for selector in cookie_selectors:
-                    try:
-                        if page.locator(selector).count() > 0:
-                            logger.info(f"Found cookie button with selector: {selector}")
-                            page.locator(selector).click(timeout=5000)
-                            logger.info(f"Clicked {selector} button")
-                            time.sleep(0.2)  # Increased wait after clicking
-                            break
-                    except Exception as click_error:
-                        logger.warning(f"Could not click {selector}: {str(click_error)}")
-        except Exception as e:
-            logger.warning(f"Cookie handling error: {e}")
-        
-        # Wait a bit longer for page to settle after cookie handling
-        time.sleep(0.3)
-        
-        # Scroll down more aggressively to trigger lazy loading
-        logger.info("Scrolling to trigger lazy loading...")
-        for i in range(15):  # Increased from 6 to 15
-            # Scroll down with a natural speed
-            scroll_amount = 500 + random.randint(200, 400)
-            page.evaluate(f"window.scrollBy(0, {scroll_amount})")
-            
-            # Longer wait between scrolls
-            time.sleep(random.random() * 1.0)
-            
-            # Occasionally move the mouse while scrolling to look more human
-            if random.random() > 0.6:
-                page.mouse.move(random.randint(100, 800), random.randint(200, 600))
-        
-        # Wait longer after scrolling
-        time.sleep(0.31)
+            if (record.name || record.url) records.push(record);
+        }
+        if (records.length) return records;
+    }
+    return [];
+}"""
+
+class HMAdapter(RetailerAdapter):
+    """H&M search: products come from __NEXT_DATA__, with DOM and API fallbacks"""
+
+    name = "hm"
+    display_name = "H&M"
+    service_name = "hm-fashion-scraper"
+    default_port = 5003
+
+    context_options = {
+        "viewport": {"width": 1366, "height": 768},
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    }
+    extra_headers = {
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+        "sec-ch-ua": '"Not_A Brand";v="8", "Chromium";v="120"',
+        "sec-ch-ua-platform": '"Windows"',
+        "sec-ch-ua-mobile": "?0",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1"
+    }
+    stealth_script = HM_STEALTH_JS
+
+    # H&M's search and product listing services
+    capture_patterns = (
+        r'search-services',
+        r'/search-results',
+        r'/product(s|list)?/',
+    )
+
+    # Navigate to the page with increased timeout
+    navigation_strategies = (("networkidle", 120000),)
+
+    cookie_selectors = (
+        "[data-testid='cookie-accept-all']",
+        "button:has-text('Accept')",
+        "button:has-text('ACCEPT ALL')",
+        "button:has-text('Accept all')",
+        ".cookie-accept-button",
+        "button:has-text('Accept cookies')",
+        "button:has-text('I accept')",
+        ".cookie-banner button",
+        "//button[contains(text(), 'Accept')]",
+        "//button[contains(text(), 'accept')]"
+    )
+    cookie_click_pause = 0.2
+
+    # Wait a bit longer for page to settle after cookie handling
+    settle_pause = 0.3
+
+    # Scroll down more aggressively to trigger lazy loading
+    scroll_steps = 15
+    scroll_amount = 500
+    scroll_pause = 1.0
+    after_scroll_pause = 0.31
+
+    def build_search_url(self, search_term):
+        """Create the search URL - using US site"""
+        return f"https://www2.hm.com/en_us/search-results.html?q={search_term.replace(' ', '%20')}"
+
+    async def extract_products(self, page, capture, search_term, limit=None):
+        """Extract products from __NEXT_DATA__, falling back to the DOM and captured API responses"""
+        search_url = self.build_search_url(search_term)
+        currency = self.currency_for(page, search_term)
+        api_responses = capture.responses
+        products = []
         
         # Extract NEXT_DATA from page for product information
         logger.info("Extracting __NEXT_DATA__ from page...")
         try:
             # First try NEXT_DATA script element
-            product_script = page.evaluate("""() => {
+            product_script = await page.evaluate("""() => {
                 const scriptElement = document.getElementById('__NEXT_DATA__');
                 if (scriptElement) {
                     return scriptElement.textContent;
@@ -226,155 +180,53 @@ def scrape_hm_search_results(search_term):
                 product_json = json.loads(product_script)
                 
                 # Try to extract products from the parsed JSON (H&M specific structure)
-                try:
-                    # Path to products in H&M's NEXT_DATA structure
-                    if 'props' in product_json and 'pageProps' in product_json['props']:
-                        page_props = product_json['props']['pageProps']
-                        logger.info(f"Keys in pageProps: {list(page_props.keys())}")
-                        
-                        # Try different paths for products
-                        hits = None
-                        if 'srpProps' in page_props and 'hits' in page_props['srpProps']:
-                            hits = page_props['srpProps']['hits']
-                            logger.info(f"Found {len(hits)} products in srpProps.hits")
-                        elif 'searchResult' in page_props and 'products' in page_props['searchResult']:
-                            hits = page_props['searchResult']['products']
-                            logger.info(f"Found {len(hits)} products in searchResult.products")
-                        elif 'products' in page_props:
-                            hits = page_props['products']
-                            logger.info(f"Found {len(hits)} products in pageProps.products")
-                            
-                        if hits and len(hits) > 0:
-                            logger.info(f"Processing {len(hits)} products from __NEXT_DATA__")
-                            for product in hits:
-                                try:
-                                    # Extract essential product data
-                                    standard_product = extract_hm_product_data(product, search_term)
-                                    if standard_product:
-                                        products.append(standard_product)
-                                except Exception as prod_error:
-                                    logger.error(f"Error processing product: {str(prod_error)}")
-                        else:
-                            logger.warning("No products found in the expected NEXT_DATA paths")
-                    else:
-                        logger.warning("No props.pageProps found in NEXT_DATA")
-                        
-                except KeyError as key_error:
-                    logger.error(f"Error finding products in __NEXT_DATA__: {str(key_error)}")
+                hits = find_hm_hits(product_json)
+                if hits:
+                    logger.info(f"Processing {len(hits)} products from __NEXT_DATA__")
+                    add_hm_products(hits, search_term, products, currency)
+                else:
+                    logger.warning("No products found in the expected NEXT_DATA paths")
             else:
                 logger.warning("No __NEXT_DATA__ script found on the page")
                 
         except Exception as script_error:
             logger.error(f"Error extracting __NEXT_DATA__: {str(script_error)}")
         
+        # Fetch further result pages in parallel instead of scrolling for them
+        if limit and products and len(products) < limit:
+            try:
+                page_urls = build_numbered_page_urls(search_url, len(products), limit - len(products))
+                logger.info(f"Fetching {len(page_urls)} more result pages in parallel")
+                page_scripts = await page.evaluate(FETCH_NEXT_DATA_JS, page_urls)
+                for page_script in page_scripts:
+                    if page_script:
+                        add_hm_products(find_hm_hits(json.loads(page_script)) or [], search_term, products, currency)
+                logger.info(f"Have {len(products)} products after fetching more pages")
+            except Exception as paging_error:
+                logger.error(f"Error fetching more result pages: {str(paging_error)}")
+        
         # If no products found from NEXT_DATA, try DOM extraction
         if not products:
             logger.info("No products found from __NEXT_DATA__, trying DOM extraction...")
             try:
-                # Try to count product items to verify they exist
-                product_count = page.evaluate("""() => {
-                    const productItems = document.querySelectorAll('li.product-item');
-                    return productItems.length;
-                }""")
-                
-                logger.info(f"Found {product_count} product items in DOM via JavaScript evaluation")
+                records = await page.evaluate(HM_DOM_PRODUCTS_JS, HM_DOM_SELECTORS)
+                logger.info(f"Found {len(records)} product items in the DOM")
                 
-                # Extract products from the DOM - try different selectors
-                selectors_to_try = [
-                    "li.product-item", 
-                    ".product-item",
-                    "[data-testid='product-item']",
-                    ".product-grid li",
-                    ".product-grid article"
-                ]
-                
-                for selector in selectors_to_try:
-                    product_items = page.query_selector_all(selector)
-                    if product_items and len(product_items) > 0:
-                        logger.info(f"Found {len(product_items)} products using selector: {selector}")
-                        
-                        for item in product_items:
-                            try:
-                                # # Take a screenshot of the item for debugging
-                                # if len(products) < 3:  # Only for first few products to avoid too many files
-                                #     try:
-                                #         screenshot_path = f"product_item_{len(products)}.png"
-                                #         item.screenshot(path=screenshot_path)
-                                #         logger.info(f"Saved screenshot to {screenshot_path}")
-                                #     except:
-                                #         logger.warning("Failed to take screenshot of product item")
-                                        
-                                # Extract product data from DOM
-                                product_data = {}
-                                
-                                # Extract product URL - try different approaches
-                                link_element = item.query_selector("a")
-                                if link_element:
-                                    href = link_element.get_attribute("href")
-                                    if href:
-                                        product_data["product_url"] = "https://www2.hm.com" + href if href.startswith("/") else href
-                                
-                                # Try to get inner HTML for debugging
-                                try:
-                                    html = item.inner_html()
-                                    logger.info(f"Product item HTML (first 200 chars): {html[:200]}")
-                                except:
-                                    logger.warning("Failed to get innerHTML of product item")
-                                
-                                # Extract product name - try different selectors
-                                for name_selector in [".item-heading a", ".item-heading", "h3", ".product-item-heading"]:
-                                    name_element = item.query_selector(name_selector)
-                                    if name_element:
-                                        product_data["name"] = name_element.inner_text().strip()
-                                        logger.info(f"Found product name: {product_data['name']}")
-                                        break
-                                
-                                # Extract product price - try different selectors
-                                for price_selector in [".item-price .price-value", ".item-price", ".product-item-price", "[data-testid='product-price']"]:
-                                    price_element = item.query_selector(price_selector)
-                                    if price_element:
-                                        price_text = price_element.inner_text().strip()
-                                        product_data["price"] = price_text
-                                        logger.info(f"Found product price: {price_text}")
-                                        break
-                                
-                                # Extract product image - try different approaches
-                                for img_selector in ["img.item-image", "img", ".product-item-image img"]:
-                                    img_element = item.query_selector(img_selector)
-                                    if img_element:
-                                        img_src = img_element.get_attribute("src") or ""
-                                        img_data_src = img_element.get_attribute("data-src") or ""
-                                        logger.info(f"Found image - src: {img_src}, data-src: {img_data_src}")
-                                        
-                                        # Use data-src if available, else use src
-                                        product_data["image_url"] = img_data_src if img_data_src else img_src
-                                        break
-                                
-                                # Add to products list if we have essential data
-                                if "name" in product_data or "product_url" in product_data:
-                                    product_data["brand"] = "H&M"
-                                    product_data["category"] = "Fashion"
-                                    product_data["availability"] = "Available"
-                                    
-                                    # Extract attributes from the product name and search term
-                                    product_name = product_data.get("name", "")
-                                    product_data["attributes"] = {
-                                        "color": extract_color_from_text(product_name + " " + search_term),
-                                        "material": "",
-                                        "style": "",
-                                        "length": extract_length_from_text(product_name)
-                                    }
-                                    
-                                    products.append(product_data)
-                                    logger.info(f"Added product: {product_data.get('name', 'Unknown')}")
-                                    
-                            except Exception as item_error:
-                                logger.error(f"Error extracting product from DOM: {str(item_error)}")
-                        
-                        # Break the loop if we found products with this selector
-                        if products:
-                            break
-                            
+                for record in records:
+                    # Extract attributes from the product name and search term
+                    product_name = record["name"]
+                    products.append(make_product(
+                        product_name or "Unknown Product",
+                        "H&M",
+                        category="Fashion",
+                        price=record["price"],
+                        currency=currency,
+                        image_url=record["image"],
+                        images=extract_image_renditions(record["image"]),
+                        product_url=record["url"],
+                        color=extract_color_from_text(product_name),
+                        length=extract_length_from_text(product_name)
+                    ))
             except Exception as dom_error:
                 logger.error(f"Error with DOM extraction: {str(dom_error)}")
         
@@ -383,7 +235,7 @@ def scrape_hm_search_results(search_term):
             logger.info(f"Trying to extract products from {len(api_responses)} API responses")
             for response in api_responses:
                 try:
-                    data = response['data']
+                    data = response.data
                     logger.info(f"API response keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
                     
                     # Look for product data in common API patterns
@@ -393,7 +245,7 @@ def scrape_hm_search_results(search_term):
                     if isinstance(data, list) and len(data) > 0:
                         for item in data:
                             if isinstance(item, dict) and ('name' in item or 'title' in item or 'productName' in item):
-                                standard_product = extract_hm_product_data(item, search_term)
+                                standard_product = extract_hm_product_data(item, search_term, currency)
                                 if standard_product:
                                     products.append(standard_product)
                                     products_found = True
@@ -411,7 +263,7 @@ def scrape_hm_search_results(search_term):
                                 if isinstance(product_data, list) and len(product_data) > 0:
                                     for item in product_data:
                                         if isinstance(item, dict):
-                                            standard_product = extract_hm_product_data(item, search_term)
+                                            standard_product = extract_hm_product_data(item, search_term, currency)
                                             if standard_product:
                                                 products.append(standard_product)
                                                 products_found = True
@@ -420,6 +272,8 @@ def scrape_hm_search_results(search_term):
                         logger.info(f"Extracted products from API response")
                 except Exception as api_error:
                     logger.error(f"Error processing API response: {str(api_error)}")
+                finally:
+                    response.release()
         
         # Take a full page screenshot for debugging
         # try:
@@ -429,46 +283,71 @@ def scrape_hm_search_results(search_term):
         # except Exception as ss_error:
         #     logger.warning(f"Failed to take full page screenshot: {str(ss_error)}")
         
-        # Close the browser
-        browser.close()
-        
-        # Try fallback if no products found
-        if not products and " " in search_term:
-            logger.warning(f"No products found for '{search_term}'. Trying simplified search...")
-            # Try a simpler search term (just first word or two)
-            simple_term = " ".join(search_term.split()[:2]) 
-            logger.info(f"Simplified search term to: '{simple_term}'")
-            
-            # Actually do the fallback search
-            return scrape_hm_search_results(simple_term)
-        
-        logger.info(f"Returning {len(products)} products")
         return products
+
+
+#########################
+# H&M SCRAPER FUNCTIONS
+#########################
+
+def find_hm_hits(product_json):
+    """Find the product list in H&M's __NEXT_DATA__ structure"""
+    # Path to products in H&M's NEXT_DATA structure
+    if not isinstance(product_json, dict) or 'pageProps' not in product_json.get('props', {}):
+        logger.warning("No props.pageProps found in NEXT_DATA")
+        return None
     
-def extract_hm_product_data(product, search_term):
-    """Extract and standardize H&M product data"""
+    page_props = product_json['props']['pageProps']
+    logger.info(f"Keys in pageProps: {list(page_props.keys())}")
+    
+    # Try different paths for products
+    hits = None
+    if 'srpProps' in page_props and 'hits' in page_props['srpProps']:
+        hits = page_props['srpProps']['hits']
+        logger.info(f"Found {len(hits)} products in srpProps.hits")
+    elif 'searchResult' in page_props and 'products' in page_props['searchResult']:
+        hits = page_props['searchResult']['products']
+        logger.info(f"Found {len(hits)} products in searchResult.products")
+    elif 'products' in page_props:
+        hits = page_props['products']
+        logger.info(f"Found {len(hits)} products in pageProps.products")
+    return hits
+
+def add_hm_products(hits, search_term, products, currency=None):
+    """Standardize H&M product hits and append them to products, priced in the storefront currency"""
+    for product in hits:
+        try:
+            # Extract essential product data
+            standard_product = extract_hm_product_data(product, search_term, currency)
+            if standard_product:
+                products.append(standard_product)
+        except Exception as prod_error:
+            logger.error(f"Error processing product: {str(prod_error)}")
+
+def extract_hm_product_data(product, search_term, currency=None):
+    """Extract and standardize H&M product data, priced in the storefront currency"""
     try:
         # Skip if product is not a dictionary
         if not isinstance(product, dict):
             return None
-            
-        # Create standardized product entry
-        standard_product = {
-            "name": product.get("title", "Unknown Product"),
-            "brand": "H&M",
-            "category": product.get("category", "Fashion"),
-            "size": "Standard",  # Size info not available in search results
-            "availability": "Available",
-            "price": extract_price(product),
-            "image_url": extract_image_url(product),
-            "product_url": extract_product_url(product),
-            "attributes": {
-                "color": extract_color(product, search_term),
-                "material": extract_material(product),
-                "style": "",
-                "length": extract_length(product)
-            }
-        }
+        price_cents, currency = extract_price(product, currency)
+        image_url = extract_image_url(product)
+
+        # Create standardized product entry; only schema fields are kept
+        standard_product = make_product(
+            product.get("title", "Unknown Product"),
+            "H&M",
+            category=product.get("category", "Fashion"),
+            size="Standard",  # Size info not available in search results
+            image_url=image_url,
+            images=extract_image_renditions(image_url),
+            product_url=extract_product_url(product),
+            color=extract_color(product),
+            material=extract_material(product),
+            length=extract_length(product),
+            price_cents=price_cents,
+            currency=currency
+        )
         
         return standard_product
         
@@ -476,47 +355,21 @@ def extract_hm_product_data(product, search_term):
         logger.error(f"Error standardizing product: {e}")
         return None
 
-def extract_price(product):
-    """Extract price from H&M product data"""
-    # Try regular price field
-    regular_price = product.get("regularPrice")
-    if regular_price:
-        # Check if it's a string with currency or just a number
-        if isinstance(regular_price, str) and ('$' in regular_price or '€' in regular_price):
-            return regular_price
-        else:
-            try:
-                # Format as USD price
-                price_float = float(regular_price)
-                return f"${price_float:.2f}"
-            except (ValueError, TypeError):
-                pass
-    
-    # Try sale price if regular price not available
-    sale_price = product.get("salePrice")
-    if sale_price:
-        if isinstance(sale_price, str) and ('$' in sale_price or '€' in sale_price):
-            return sale_price
-        else:
-            try:
-                price_float = float(sale_price)
-                return f"${price_float:.2f}"
-            except (ValueError, TypeError):
-                pass
-    
-    # Try price field as fallback
-    price = product.get("price")
-    if price:
-        if isinstance(price, str) and ('$' in price or '€' in price):
-            return price
-        else:
-            try:
-                price_float = float(price)
-                return f"${price_float:.2f}"
-            except (ValueError, TypeError):
-                pass
-    
-    return "Price not available"
+def extract_price(product, currency=None):
+    """
+    Extract the normalized price from H&M product data.
+
+    H&M sends prices as display strings ("$ 29.99") or as numbers in major
+    units; the regular price wins over the sale price.
+
+    Returns:
+        An (amount in minor units, currency) tuple; amount is None if there's no price
+    """
+    for field in ("regularPrice", "salePrice", "price"):
+        price, price_currency = normalize_price(product.get(field), currency)
+        if price is not None:
+            return price, price_currency
+    return None, currency
 
 
 # def extract_image_url(product):
@@ -609,13 +462,26 @@ def extract_price(product):
 #     # If none of the special cases apply, return the URL as is
 #     return raw_url
 
+# H&M article numbers in image paths
+ARTICLE_NUMBER = re.compile(r'(\d{7,10})')
+
+# Size tiers of the lp2 CDN's res[] parameter and their approximate widths
+HM_IMAGE_TIERS = (("s", 396), ("m", 564), ("l", 1024))
+
+def extract_image_renditions(image_url):
+    """(width, url) renditions of an H&M image URL, from its res[] tier or imwidth parameter"""
+    if not image_url:
+        return ()
+    if "res[m]" in image_url:
+        return tuple((width, image_url.replace("res[m]", f"res[{tier}]")) for tier, width in HM_IMAGE_TIERS)
+    if "image.hm.com" in image_url:
+        return width_renditions(width_template(image_url, "imwidth"))
+    return ()
+
 def extract_image_url(product):
     """
     H&M image URL extractor that handles the fallback to logo scenario
     """
-    import os
-    import re
-    
     # Handle invalid input
     if not product or not isinstance(product, dict):
         return ""
@@ -708,7 +574,7 @@ def extract_image_url(product):
     # Handle relative URLs
     if raw_url.startswith("/"):
         # Try to extract article number from URL if present
-        article_match = re.search(r'(\d{7,10})', raw_url)
+        article_match = ARTICLE_NUMBER.search(raw_url)
         if article_match:
             article_number = article_match.group(1)
             # Use article number in CDN format
@@ -745,8 +611,13 @@ def extract_product_url(product):
     
     return ""
 
-def extract_color(product, search_term):
-    """Extract color information from H&M product data"""
+def extract_color(product):
+    """
+    Extract color information from H&M product data.
+
+    The search term is never used: it carries the photo's color, so a product
+    colored from it would always match the photo in ranking and facets.
+    """
     # Check for direct color information
     color = product.get("color") or product.get("colorName")
     if color and isinstance(color, str):
@@ -762,30 +633,11 @@ def extract_color(product, search_term):
         # This would require a mapping table of H&M color codes
         
     # Try to extract from product name
-    name = product.get("title", "")
-    if name:
-        return extract_color_from_text(name + " " + search_term)
-    
-    # Extract from search term if no other sources available
-    return extract_color_from_text(search_term)
+    return extract_color_from_text(product.get("title", ""))
 
 def extract_color_from_text(text):
     """Extract color information from text"""
-    if not text or not isinstance(text, str):
-        return "Unknown"
-        
-    text = text.lower()
-    
-    # Common colors to look for
-    colors = ['black', 'white', 'red', 'blue', 'green', 'yellow', 'purple', 'pink', 
-              'orange', 'brown', 'gray', 'grey', 'beige', 'navy', 'teal', 'cream',
-              'anthracite', 'ivory', 'silver', 'gold', 'burgundy', 'maroon', 'olive']
-    
-    for color in colors:
-        if color in text:
-            return color.capitalize()
-    
-    return "Unknown"
+    return classify(text).color.value
 
 def extract_material(product):
     """Extract material information from H&M product data"""
@@ -794,24 +646,9 @@ def extract_material(product):
     if material and isinstance(material, str):
         return material
     
-    # Try to extract from description
+    # Try to extract the materials mentioned in the description
     description = product.get("description") or product.get("shortDescription")
-    if description and isinstance(description, str):
-        # Common materials to look for
-        materials = ['cotton', 'polyester', 'linen', 'wool', 'silk', 'viscose', 'nylon',
-                      'elastane', 'spandex', 'rayon', 'acrylic', 'cashmere', 'modal']
-        
-        description = description.lower()
-        found_materials = []
-        
-        for material in materials:
-            if material in description:
-                found_materials.append(material.capitalize())
-        
-        if found_materials:
-            return ", ".join(found_materials)
-    
-    return ""
+    return ", ".join(classify(description).materials)
 
 def extract_length(product):
     """Extract length information from H&M product data"""
@@ -829,163 +666,11 @@ def extract_length(product):
 
 def extract_length_from_text(text):
     """Extract length information from text"""
-    if not text or not isinstance(text, str):
-        return "Standard"
-        
-    text = text.lower()
-    
-    # Length terms to look for
-    length_terms = {
-        'mini': ['mini', 'short'],
-        'midi': ['midi', 'medium', 'mid-length', 'mid length', 'mid-level'],
-        'maxi': ['maxi', 'long', 'full-length', 'full length', 'floor-length'],
-        'knee-length': ['knee', 'knee-length', 'knee length']
-    }
-    
-    for length_type, terms in length_terms.items():
-        for term in terms:
-            if term in text:
-                return length_type.capitalize()
-    
-    return "Standard"
-
-#########################
-# SCRAPING FUNCTIONS
-#########################
-
-def scrape_fashion_sites(clothing_attributes):
-    """
-    Scrape fashion websites for items matching the given attributes.
-    
-    Args:
-        clothing_attributes: Dictionary with clothing attributes
-        
-    Returns:
-        Dictionary with scraped fashion items
-    """
-    logger.info(f"Scraping for clothing attributes: {json.dumps(clothing_attributes)}")
-    
-    # Try to get the search string first
-    search_string = clothing_attributes.get("attributes", {}).get("search_string", "")
-    
-    # If no search string is provided, fall back to color + clothing_type
-    if not search_string:
-        clothing_type = clothing_attributes.get("clothing_type", "")
-        color = clothing_attributes.get("attributes", {}).get("color", "")
-        search_string = f"{color} {clothing_type}".strip()
-    
-    # If we still don't have a search string, use a default
-    if not search_string:
-        search_string = "clothing"  # Fallback search term
-    
-    logger.info(f"Using search string: {search_string}")
-    
-    try:
-        # Get results from H&M
-        hm_products = scrape_hm_search_results(search_string)
-        
-        # Log the number of products found
-        logger.info(f"Found {len(hm_products)} products from H&M")
-        
-        # Ensure we have a valid list (even if empty)
-        if hm_products is None:
-            hm_products = []
-        
-        # If no products found with specific search, try a simpler search
-        if len(hm_products) == 0 and " " in search_string:
-            simple_term = " ".join(search_string.split()[:2])
-            logger.info(f"No products found. Trying simplified search: {simple_term}")
-            hm_products = scrape_hm_search_results(simple_term)
-            logger.info(f"Found {len(hm_products)} products with simplified search")
-            
-        # Return a properly structured response
-        return {
-            "status": True,
-            "search_term": search_string,
-            "items": hm_products
-        }
-    except Exception as e:
-        logger.error(f"Error in scrape_fashion_sites: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
-        
-        # Return empty list with success status (don't propagate error)
-        return {
-            "status": True,
-            "search_term": search_string,
-            "items": []
-        }
+    return classify(text).length.value.capitalize()
 
-#########################
-# FLASK ROUTES
-#########################
-
-# Main scraping endpoint
-@app.route('/api/scrape', methods=['POST'])
-@limiter.limit("5 per minute")  # Reduced rate limit due to scraping load
-def scrape_fashion_endpoint():
-    try:
-        # Get request data
-        clothing_attributes = request.json
-        logger.info(f"Received request with attributes: {json.dumps(clothing_attributes)}")
-        
-        if not clothing_attributes:
-            logger.error("No clothing attributes provided")
-            return jsonify({"status": False, "message": "No clothing attributes provided"}), 400
-        
-        # Validate the input data structure but be more flexible
-        if "clothing_type" not in clothing_attributes and "search_string" not in clothing_attributes.get("attributes", {}):
-            logger.error("Missing required fields: either clothing_type or search_string is required")
-            return jsonify({
-                "status": False, 
-                "message": "Missing required fields: either clothing_type or search_string is required"
-            }), 400
-        
-        # Scrape fashion sites for items matching the attributes
-        logger.info("Calling scrape_fashion_sites function")
-        scraping_result = scrape_fashion_sites(clothing_attributes)
-        
-        # Check that we actually got a valid result 
-        if not isinstance(scraping_result, dict):
-            logger.error(f"Invalid result type from scrape_fashion_sites: {type(scraping_result)}")
-            scraping_result = {"status": True, "items": []}
-        
-        # Make sure items exists in the result
-        if "items" not in scraping_result:
-            logger.error("No 'items' key in scraping_result")
-            scraping_result["items"] = []
-        
-        # Log the result for debugging
-        logger.info(f"Scraping result status: {scraping_result.get('status', False)}")
-        logger.info(f"Number of items found: {len(scraping_result.get('items', []))}")
-        
-        # Return the result
-        result = {
-            "status": True,
-            "query": scraping_result.get("search_term", ""),
-            "items": scraping_result.get("items", [])
-        }
-        
-        # Log the response being sent
-        logger.info(f"Sending response with {len(result['items'])} items")
-        return jsonify(result), 200
-        
-    except Exception as e:
-        logger.error(f"An error occurred in scrape_fashion route: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return jsonify({
-            "status": False, 
-            "message": f"An internal error occurred: {str(e)}"
-        }), 500
-
-# Health check endpoint
-@app.route('/health', methods=['GET'])
-def health_check():
-    return jsonify({"status": "healthy", "service": "hm-fashion-scraper"}), 200
+adapter = HMAdapter()
+app = create_app(adapter)
 
 # Main entry point
 if __name__ == '__main__':
-    port = int(os.environ.get("PORT", 5003))  # Use port 5003 by default
-    print(f"Starting scraper service on http://127.0.0.1:{port}")
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    run_dev_server(app, adapter)
@@ -0,0 +1,58 @@
+"""
+Shared scraping engine for the retailer scraper services.
+
+Each retailer service defines a RetailerAdapter (search URL and product
+extraction) and builds its Flask app with create_app; everything else -
+browser pooling, response capture, pacing, caching, metrics and the job
+queue - lives here so every retailer gets the same behavior.
+"""
+
+from .adapter import RetailerAdapter
+from .app import create_app, run_dev_server
+from .capture import ResponseCapture
+from .classifier import classify
+from .dedup import canonical_url, merge_products
+from .images import IMAGE_WIDTHS, width_template, width_renditions, parse_thumb_width, with_thumbnails
+from .engine import ScrapeEngine
+from .ranking import RankingProfile, score_product, score_products, top_products
+from .similarity import ThumbnailFetcher, color_histogram, histogram_from_file, rerank_by_color
+from .facets import FACETS, PRICE_BUCKETS, compute_facets, parse_filters, filter_products
+from .traversal import JsonWalker, SKIP
+from .paths import ANY, generalize_path, follow_path
+from .models import (
+    Product,
+    ProductAttributes,
+    Availability,
+    Color,
+    Length,
+    parse_price,
+    parse_colors,
+    parse_images,
+    format_price,
+    encode_value,
+)
+from .schema import (
+    PRODUCT_FIELDS,
+    ATTRIBUTE_FIELDS,
+    make_product,
+    enforce_schema,
+    parse_fields,
+)
+from .pricing import (
+    currency_for_url,
+    normalize_price,
+    sort_by_price,
+    filter_by_price,
+)
+from .paging import (
+    FETCH_JSON_JS,
+    FETCH_NEXT_DATA_JS,
+    build_page_urls,
+    build_numbered_page_urls,
+)
+from .wire import (
+    ACCEPT_HEADER,
+    accepts_msgpack,
+    encode_body,
+    decode_response,
+)
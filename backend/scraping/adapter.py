@@ -0,0 +1,119 @@
+from .metrics import ScrapeMetrics
+from .paths import ExtractionPathCache
+from .pricing import currency_for_url
+
+
+class RetailerAdapter:
+    """
+    Everything the scraping engine needs to know about one retailer.
+
+    Subclasses override the class attributes that describe how the site
+    behaves (navigation, cookie banner, scrolling) and implement
+    build_search_url and extract_products. Browser handling, response
+    capture, pacing, caching and metrics all live in the engine.
+    """
+
+    # Identity
+    name = "retailer"
+    display_name = "Retailer"
+    service_name = "fashion-scraper"
+    default_port = 5000
+
+    # Browser context options and headers sent with every request
+    context_options = {
+        "viewport": {"width": 1366, "height": 768}
+    }
+    extra_headers = {}
+    # JavaScript function run in every page before the site's own scripts
+    stealth_script = None
+
+    # Regular expressions for the API URLs whose JSON responses hold products;
+    # empty captures any JSON response with "api", "search" or "product" in its URL
+    capture_patterns = ()
+    # Extract each captured response as it arrives (see extract_response)
+    stream_extraction = False
+
+    # (wait_until, timeout_ms) tried in order until one navigation succeeds;
+    # a wait_until of None waits for nothing
+    navigation_strategies = (("load", 45000),)
+    # Pause and move the mouse after navigation to look more human
+    warm_up = False
+
+    # Cookie banner buttons tried in order, and the pause after clicking one
+    cookie_selectors = ()
+    cookie_click_pause = 0.2
+    # Fall back to clicking any accept-looking button inside a dialog
+    accept_dialogs = False
+
+    # Selector that shows products have rendered, and the pause before scrolling
+    ready_selector = None
+    settle_pause = 0
+
+    # Lazy-loading scroll: steps without a limit, base pixels per step
+    # (plus 200-400 random), the most random pause between steps, and the
+    # pause after the last step
+    scroll_steps = 8
+    scroll_amount = 300
+    scroll_pause = 1.0
+    after_scroll_pause = 0.1
+
+    def __init__(self):
+        # Shared with the engine, so extraction can record its own counters
+        self.metrics = ScrapeMetrics()
+        # Where products were found in the retailer's JSON, learned per URL pattern
+        self.extraction_paths = ExtractionPathCache()
+
+    def build_search_url(self, search_term):
+        """Return the search results URL for a search term"""
+        raise NotImplementedError
+
+    def currency_for(self, page, search_term):
+        """
+        Return the ISO currency the storefront prices in.
+
+        Taken from the locale of the page's URL, so a redirect to another
+        country's store is followed, falling back to the search URL's locale.
+        """
+        return currency_for_url(page.url) or currency_for_url(self.build_search_url(search_term))
+
+    def extract_response(self, response):
+        """
+        Extract products from one captured API response.
+
+        With stream_extraction this runs on a worker thread as each response
+        arrives; the results are left in response.products for
+        extract_products.
+
+        Args:
+            response: A CapturedResponse
+
+        Returns:
+            A list of products (in whatever form extract_products expects)
+        """
+        return []
+
+    def product_key(self, product):
+        """
+        Key of the result a streamed product ends up merged into, e.g. its
+        base reference, so the scroll counts unique products rather than
+        duplicate and color-variant entries.
+
+        Returns:
+            A hashable key, or None to count the product on its own
+        """
+        return None
+
+    async def extract_products(self, page, capture, search_term, limit=None):
+        """
+        Extract standardized products from a loaded, scrolled search page.
+
+        Args:
+            page: The Playwright page showing the search results
+            capture: The ResponseCapture holding the page's API responses
+            search_term: The search term the page was loaded for
+            limit: Optional number of products wanted
+
+        Returns:
+            A list of standardized product dictionaries
+        """
+        raise NotImplementedError
@@ -0,0 +1,262 @@
+import os
+import logging
+import threading
+import traceback
+import concurrent.futures
+from flask import Flask, Response, request, jsonify
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_cors import CORS
+from .engine import ScrapeEngine, parse_limit, get_search_string
+from .images import parse_thumb_width, with_thumbnails
+from .jobs import QueueFullError, ScrapeJobQueue
+from .schema import parse_fields
+from .wire import accepts_msgpack, encode_body
+
+logger = logging.getLogger(__name__)
+
+# Number of browser workers and how many jobs may wait for one
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", 2))
+SCRAPE_QUEUE_SIZE = int(os.environ.get("SCRAPE_QUEUE_SIZE", 8))
+# How long a request waits for its job before giving up (seconds)
+SCRAPE_JOB_TIMEOUT = int(os.environ.get("SCRAPE_JOB_TIMEOUT", 240))
+# Most search terms a single batch request may open as tabs
+SCRAPE_BATCH_MAX_TERMS = int(os.environ.get("SCRAPE_BATCH_MAX_TERMS", 8))
+# All traffic comes from the backend's address, so this only guards against runaway callers
+SCRAPE_RATE_LIMIT = os.environ.get("SCRAPE_RATE_LIMIT", "60 per minute")
+
+def queue_full_response(full_error):
+    """Build the 429 response for a scrape queue that can't take another job"""
+    logger.warning(str(full_error))
+    response = jsonify({
+        "status": False,
+        "message": "Scraper is busy, please retry later",
+        "retry_after": full_error.retry_after
+    })
+    response.headers["Retry-After"] = str(full_error.retry_after)
+    return response, 429
+
+def abandon_job(job, stop):
+    """
+    Give up on a scrape job whose caller timed out: a queued job is dropped
+    before a worker picks it up, and a running one is cancelled, freeing its
+    browser worker
+    """
+    if not job.cancel():
+        stop.set()
+
+def products_response(payload, fields=None, status=200):
+    """
+    Response for a payload holding Products, trimmed to the requested fields.
+
+    Encoded as msgpack or JSON depending on the Accept header, and gzipped
+    when large and the caller accepts gzip.
+    """
+    body, headers = encode_body(
+        payload,
+        fields,
+        use_msgpack=accepts_msgpack(request.accept_mimetypes),
+        use_gzip="gzip" in request.accept_encodings
+    )
+    return Response(body, status=status, headers=headers)
+
+def create_app(adapter):
+    """
+    Build the Flask scraper service for one retailer.
+
+    Args:
+        adapter: The RetailerAdapter describing the retailer
+
+    Returns:
+        The Flask app, with the engine and job queue attached as
+        app.scrape_engine and app.scrape_queue
+    """
+    # Initialize Flask app
+    app = Flask(adapter.service_name)
+    CORS(app)  # Enable CORS for cross-service communication
+
+    # Initialize Flask-Limiter
+    limiter = Limiter(
+        get_remote_address,
+        app=app,
+        default_limits=["300 per day", "60 per hour"],
+        storage_uri="memory://"  # Use Redis in production: "redis://localhost:6379/0"
+    )
+
+    engine = ScrapeEngine(adapter)
+    scrape_queue = ScrapeJobQueue(SCRAPE_WORKERS, SCRAPE_QUEUE_SIZE)
+    app.scrape_engine = engine
+    app.scrape_queue = scrape_queue
+
+    #########################
+    # FLASK ROUTES
+    #########################
+
+    # Main scraping endpoint
+    @app.route('/api/scrape', methods=['POST'])
+    @limiter.limit(SCRAPE_RATE_LIMIT)  # Overload is handled by the scrape queue
+    def scrape_fashion_endpoint():
+        try:
+            # Get request data
+            clothing_attributes = request.json
+
+            if not clothing_attributes:
+                logger.error("No clothing attributes provided")
+                return jsonify({"status": False, "message": "No clothing attributes provided"}), 400
+
+            # Validate the input data structure but be more flexible
+            if "clothing_type" not in clothing_attributes and "search_string" not in clothing_attributes.get("attributes", {}):
+                logger.error("Missing required fields: either clothing_type or search_string is required")
+                return jsonify({
+                    "status": False,
+                    "message": "Missing required fields: either clothing_type or search_string is required"
+                }), 400
+
+            # Only the requested number of products and fields are sent back,
+            # with images sized for the caller's thumbnails
+            try:
+                fields = parse_fields(clothing_attributes.get("fields"))
+                thumb_width = parse_thumb_width(clothing_attributes.get("thumb_width"))
+            except ValueError as fields_error:
+                return jsonify({"status": False, "message": str(fields_error)}), 400
+
+            # A cached search needs no browser, so it skips the queue
+            limit = parse_limit(clothing_attributes)
+            search_string = get_search_string(clothing_attributes)
+            logger.info(f"Received scrape request for '{search_string}' (limit {limit})")
+            cached_items = engine.cache.get((search_string, limit))
+            if cached_items is not None:
+                engine.metrics.incr("cache_hits")
+                logger.info(f"Serving {len(cached_items)} cached items for '{search_string}'")
+                return products_response({
+                    "status": True,
+                    "query": search_string,
+                    "items": with_thumbnails(cached_items[:limit] if limit else cached_items, thumb_width),
+                    "queue_wait_ms": 0
+                }, fields)
+
+            # Queue the scrape for the next free browser worker
+            stop = threading.Event()
+            try:
+                job = scrape_queue.submit(engine.scrape_fashion_sites, clothing_attributes, stop)
+            except QueueFullError as full_error:
+                return queue_full_response(full_error)
+
+            logger.info(f"Queued scrape job ({scrape_queue.stats()['queue_depth']} waiting)")
+            try:
+                scraping_result = job.result(timeout=SCRAPE_JOB_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                logger.error(f"Scrape job did not finish within {SCRAPE_JOB_TIMEOUT}s")
+                abandon_job(job, stop)
+                return jsonify({"status": False, "message": "Scrape timed out"}), 504
+
+            # Check that we actually got a valid result
+            if not isinstance(scraping_result, dict):
+                logger.error(f"Invalid result type from scrape_fashion_sites: {type(scraping_result)}")
+                scraping_result = {"status": True, "items": []}
+
+            # Make sure items exists in the result
+            if "items" not in scraping_result:
+                logger.error("No 'items' key in scraping_result")
+                scraping_result["items"] = []
+
+            # Log the result for debugging
+            logger.info(f"Scraping result status: {scraping_result.get('status', False)}")
+            logger.info(f"Number of items found: {len(scraping_result.get('items', []))}")
+
+            # Return the result
+            result = {
+                "status": True,
+                "query": scraping_result.get("search_term", ""),
+                "items": with_thumbnails(scraping_result.get("items", []), thumb_width),
+                "queue_wait_ms": int(getattr(job, "queue_wait", 0) * 1000)
+            }
+
+            # Log the response being sent
+            logger.info(f"Sending response with {len(result['items'])} items")
+            return products_response(result, fields)
+
+        except Exception as e:
+            logger.error(f"An error occurred in scrape_fashion route: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                "status": False,
+                "message": f"An internal error occurred: {str(e)}"
+            }), 500
+
+    # Batch scraping endpoint - many search terms in one browser session
+    @app.route('/api/scrape/batch', methods=['POST'])
+    @limiter.limit(SCRAPE_RATE_LIMIT)
+    def scrape_batch_endpoint():
+        try:
+            payload = request.json or {}
+            search_terms = payload.get("search_terms")
+
+            if not isinstance(search_terms, list) or not search_terms:
+                return jsonify({"status": False, "message": "search_terms must be a non-empty list"}), 400
+
+            search_terms = [term.strip() for term in search_terms if isinstance(term, str) and term.strip()]
+            search_terms = list(dict.fromkeys(search_terms))
+            if not search_terms:
+                return jsonify({"status": False, "message": "search_terms must contain strings"}), 400
+            if len(search_terms) > SCRAPE_BATCH_MAX_TERMS:
+                return jsonify({
+                    "status": False,
+                    "message": f"At most {SCRAPE_BATCH_MAX_TERMS} search terms per batch"
+                }), 400
+
+            try:
+                fields = parse_fields(payload.get("fields"))
+                thumb_width = parse_thumb_width(payload.get("thumb_width"))
+            except ValueError as fields_error:
+                return jsonify({"status": False, "message": str(fields_error)}), 400
+
+            logger.info(f"Received batch request for {len(search_terms)} search terms")
+
+            # The whole batch is one job: one browser, one tab per term
+            stop = threading.Event()
+            try:
+                job = scrape_queue.submit(engine.scrape_fashion_batch, search_terms, parse_limit(payload), stop)
+            except QueueFullError as full_error:
+                return queue_full_response(full_error)
+
+            try:
+                batch_result = job.result(timeout=SCRAPE_JOB_TIMEOUT)
+            except concurrent.futures.TimeoutError:
+                logger.error(f"Batch scrape job did not finish within {SCRAPE_JOB_TIMEOUT}s")
+                abandon_job(job, stop)
+                return jsonify({"status": False, "message": "Scrape timed out"}), 504
+
+            for term_result in batch_result["results"]:
+                term_result["items"] = with_thumbnails(term_result["items"], thumb_width)
+            batch_result["queue_wait_ms"] = int(getattr(job, "queue_wait", 0) * 1000)
+            logger.info(f"Sending batch response for {len(batch_result['results'])} search terms")
+            return products_response(batch_result, fields)
+
+        except Exception as e:
+            logger.error(f"An error occurred in scrape_batch route: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                "status": False,
+                "message": f"An internal error occurred: {str(e)}"
+            }), 500
+
+    # Health check endpoint
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        return jsonify({
+            "status": "healthy",
+            "service": adapter.service_name,
+            "queue": scrape_queue.stats(),
+            "cache_entries": len(engine.cache),
+            "metrics": engine.metrics.snapshot(),
+            "extraction_paths": adapter.extraction_paths.snapshot()
+        }), 200
+
+    return app
+
+def run_dev_server(app, adapter):
+    """Run the Flask development server on PORT or the adapter's default port"""
+    port = int(os.environ.get("PORT", adapter.default_port))
+    print(f"Starting scraper service on http://127.0.0.1:{port}")
+    app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,123 @@
+import os
+import asyncio
+import logging
+import threading
+from playwright.async_api import async_playwright
+from .jobs import JobCancelledError
+
+logger = logging.getLogger(__name__)
+
+# Jobs a browser serves before it is replaced, to cap memory growth
+BROWSER_RECYCLE_JOBS = int(os.environ.get("BROWSER_RECYCLE_JOBS", 50))
+# How often a running job checks whether its caller has stopped waiting (seconds)
+JOB_STOP_POLL = float(os.environ.get("JOB_STOP_POLL", 0.5))
+
+# Enhanced browser launch with stealth options
+LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--window-size=1440,900'
+]
+
+
+class BrowserSession:
+    """
+    A browser and context kept alive across jobs on one worker thread.
+
+    The session owns its own event loop, so Playwright objects never cross
+    threads, and cookies accepted on one search are reused by the next.
+    """
+
+    def __init__(self, adapter, metrics):
+        self.adapter = adapter
+        self.metrics = metrics
+        self.loop = asyncio.new_event_loop()
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.jobs = 0
+
+    async def open(self):
+        if self.browser and (not self.browser.is_connected() or self.jobs >= BROWSER_RECYCLE_JOBS):
+            logger.info(f"Recycling browser after {self.jobs} jobs")
+            await self.close()
+        if self.browser:
+            return self.context
+
+        with self.metrics.timer("browser_launch"):
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            self.context = await self.browser.new_context(**self.adapter.context_options)
+
+            # Add extra headers to seem more like a real browser
+            if self.adapter.extra_headers:
+                await self.context.set_extra_http_headers(self.adapter.extra_headers)
+            # Apply the anti-detection script before any site script runs
+            if self.adapter.stealth_script:
+                await self.context.add_init_script(f"({self.adapter.stealth_script})()")
+        self.metrics.incr("browser_launches")
+        self.jobs = 0
+        return self.context
+
+    async def close(self):
+        try:
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {e}")
+        self.playwright = None
+        self.browser = None
+        self.context = None
+
+    async def run_job(self, job, stop=None):
+        context = await self.open()
+        self.jobs += 1
+        task = asyncio.ensure_future(job(context))
+        try:
+            # Cancelling the task closes its tabs (see ScrapeEngine.scrape_tab)
+            while stop is not None and not task.done():
+                await asyncio.wait({task}, timeout=JOB_STOP_POLL)
+                if stop.is_set() and not task.done():
+                    logger.warning("Caller stopped waiting; cancelling the running scrape")
+                    task.cancel()
+            return await task
+        except asyncio.CancelledError:
+            raise JobCancelledError("Scrape cancelled after its caller stopped waiting")
+        except Exception:
+            # The browser may be in a bad state; start fresh on the next job
+            await self.close()
+            raise
+
+    def run(self, job, stop=None):
+        """Run job(context) on this session's event loop until it completes or stop is set"""
+        return self.loop.run_until_complete(self.run_job(job, stop))
+
+
+class BrowserPool:
+    """Hands each scrape worker thread its own long-lived BrowserSession"""
+
+    def __init__(self, adapter, metrics):
+        self.adapter = adapter
+        self.metrics = metrics
+        self.local = threading.local()
+
+    def run(self, job, stop=None):
+        """
+        Run an async job on the calling thread's browser.
+
+        Args:
+            job: Async function taking a browser context
+            stop: Optional threading.Event; once set, the job is cancelled and
+                JobCancelledError raised
+
+        Returns:
+            Whatever the job returns
+        """
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = BrowserSession(self.adapter, self.metrics)
+            self.local.session = session
+        return session.run(job, stop)
@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# URL fragments that mark a response as a likely product/search API call,
+# used for adapters without their own capture patterns
+CAPTURE_KEYWORDS = ('api', 'search', 'product')
+
+# Largest single response body kept, and most body bytes kept per page
+CAPTURE_MAX_BYTES = int(os.environ.get("CAPTURE_MAX_BYTES", 5 * 1024 * 1024))
+CAPTURE_TOTAL_BYTES = int(os.environ.get("CAPTURE_TOTAL_BYTES", 20 * 1024 * 1024))
+
+
+class CapturedResponse:
+    """A captured response body, parsed as JSON the first time data is read"""
+
+    __slots__ = ("url", "body", "products", "_data")
+
+    def __init__(self, url, body):
+        self.url = url
+        self.body = body
+        # Products extracted while the page was still loading; None until then
+        self.products = None
+        self._data = None
+
+    @property
+    def data(self):
+        """The parsed body, or None if it isn't valid JSON"""
+        if self.body is not None:
+            try:
+                self._data = json.loads(self.body)
+            except ValueError as json_error:
+                logger.warning(f"Could not parse JSON from {self.url}: {str(json_error)}")
+            # The raw bytes aren't needed once parsed
+            self.body = None
+        return self._data
+
+    def release(self):
+        """
+        Drop the parsed body once products are extracted from it; the byte
+        caps only count raw bodies, and parsed JSON is several times larger
+        """
+        self.body = None
+        self._data = None
+
+
+class ResponseCapture:
+    """
+    Collects the JSON API responses a page receives while it loads.
+
+    Only responses whose URL matches one of the patterns are kept, as raw
+    bytes; nothing is parsed until extraction reads a response's data, and
+    bodies past the size caps are dropped.
+
+    Given an extract function, each response is also parsed and extracted
+    on a worker thread as soon as it arrives, so products are ready when the
+    page stops scrolling and product_count can tell the scroll when to stop.
+    Given a key function too, product_count counts unique keys, which is
+    what the products merge into.
+    """
+
+    def __init__(self, patterns=None, max_bytes=CAPTURE_MAX_BYTES, total_bytes=CAPTURE_TOTAL_BYTES, extract=None, key=None):
+        """
+        Args:
+            patterns: Regular expressions for product-bearing API URLs; None
+                falls back to CAPTURE_KEYWORDS
+            max_bytes: Largest response body kept
+            total_bytes: Most body bytes kept in total
+            extract: Optional function (CapturedResponse) returning the list
+                of products in a response, run on a worker thread
+            key: Optional function (product) returning the key of the result
+                a product merges into, or None to count it on its own
+        """
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns] if patterns else None
+        self.max_bytes = max_bytes
+        self.total_bytes = total_bytes
+        self.captured_bytes = 0
+        self.responses = []
+        self.extract = extract
+        self.pending = set()
+        self.key = key
+        self.product_keys = set()
+        self.unkeyed_count = 0
+
+    @property
+    def product_count(self):
+        """Unique products extracted so far"""
+        return len(self.product_keys) + self.unkeyed_count
+
+    def attach(self, page):
+        page.on("response", self.handle_response)
+
+    def matches(self, response):
+        if self.patterns is None:
+            url = response.url.lower()
+            url_matches = any(keyword in url for keyword in CAPTURE_KEYWORDS)
+        else:
+            url_matches = any(pattern.search(response.url) for pattern in self.patterns)
+        return (
+            url_matches and
+            response.status == 200 and
+            'json' in response.headers.get('content-type', '').lower()
+        )
+
+    def has_room(self, url, size):
+        """Whether a body of size bytes fits under the caps"""
+        if size > self.max_bytes:
+            logger.warning(f"Skipping {size} byte response from {url}: over {self.max_bytes} bytes")
+            return False
+        if self.captured_bytes + size > self.total_bytes:
+            logger.warning(f"Skipping response from {url}: capture is full ({self.captured_bytes} bytes)")
+            return False
+        return True
+
+    async def handle_response(self, response):
+        try:
+            if not self.matches(response):
+                return
+            url = response.url
+
+            # Check the declared size before downloading the body
+            declared_size = response.headers.get('content-length', '')
+            if declared_size.isdigit() and not self.has_room(url, int(declared_size)):
+                return
+
+            body = await response.body()
+            if not self.has_room(url, len(body)):
+                return
+            self.captured_bytes += len(body)
+            captured = CapturedResponse(url, body)
+            self.responses.append(captured)
+            logger.info(f"Captured API response from: {url}")
+
+            if self.extract is not None:
+                task = asyncio.create_task(self.extract_in_background(captured))
+                self.pending.add(task)
+                task.add_done_callback(self.pending.discard)
+        except Exception as resp_error:
+            logger.warning(f"Error handling response: {str(resp_error)}")
+
+    async def extract_in_background(self, captured):
+        """Extract one response's products on a worker thread"""
+        try:
+            captured.products = await asyncio.to_thread(self.extract, captured)
+        except Exception as extract_error:
+            logger.warning(f"Error extracting products from {captured.url}: {str(extract_error)}")
+            captured.products = []
+        captured.release()
+        for product in captured.products:
+            key = self.key(product) if self.key is not None else None
+            if key is None:
+                self.unkeyed_count += 1
+            else:
+                self.product_keys.add(key)
+
+    async def drain(self):
+        """Wait until every captured response has been extracted"""
+        while self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+
+    def cancel(self):
+        """Stop waiting for extractions still in progress"""
+        for task in self.pending:
+            task.cancel()
@@ -0,0 +1,91 @@
+"""
+Single-pass attribute classifier for product text.
+
+Every color, length and material term, plus the size patterns, is compiled
+into one regular expression with word boundaries, so tagging a product name
+or description is one scan of the text instead of a keyword loop per
+attribute. Results are cached by text, since the extract_* helpers of one
+product classify the same name several times.
+"""
+
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from .models import Color, Length, COLOR_NAMES, LENGTH_TERMS
+
+CLASSIFIER_CACHE_SIZE = int(os.environ.get("CLASSIFIER_CACHE_SIZE", 8192))
+
+MATERIALS = (
+    'cotton', 'polyester', 'linen', 'wool', 'silk', 'viscose', 'nylon',
+    'elastane', 'spandex', 'rayon', 'acrylic', 'cashmere', 'modal'
+)
+
+# term -> (attribute, value, rank); for length the lowest rank wins, so a
+# "long-sleeve mini dress" is mini, while colors and materials go by position
+TERMS = {}
+for name, color in COLOR_NAMES.items():
+    TERMS[name] = ("color", color, 0)
+for rank, (length, terms) in enumerate(LENGTH_TERMS):
+    for term in terms:
+        TERMS.setdefault(term, ("length", length, rank))
+for material in MATERIALS:
+    TERMS[material] = ("material", material.capitalize(), 0)
+
+# Longest terms first, so "mid-length" is matched whole rather than as "mid"
+ATTRIBUTE_PATTERN = re.compile(
+    r"\b(?:"
+    r"(?:size|sz)[:\s]+(?P<size>xxxl|xxl|xl|xs|s|m|l|\d{1,2})"
+    r"|(?:us|eu)[:\s]*(?P<region_size>\d{1,2})"
+    r"|(?P<term>" + "|".join(re.escape(term) for term in sorted(TERMS, key=len, reverse=True)) + r")"
+    r")\b"
+)
+
+TextAttributes = namedtuple("TextAttributes", ("color", "length", "materials", "size"))
+NO_ATTRIBUTES = TextAttributes(Color.UNKNOWN, Length.STANDARD, (), None)
+
+def classify(text):
+    """
+    Tag the color, length, materials and size mentioned in a piece of text.
+
+    Args:
+        text: A product name, description or search term; anything but a
+            string (None, or a dict or list from a malformed payload) has no
+            attributes
+
+    Returns:
+        A TextAttributes tuple: the first color mentioned (Color.UNKNOWN if
+        none), the highest-priority length (Length.STANDARD if none), every
+        material in order of mention, and the size as written (or None)
+    """
+    # Checked before the cache, which would fail to hash a dict or list
+    if not text or not isinstance(text, str):
+        return NO_ATTRIBUTES
+    return classify_lowercase(text.lower())
+
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def classify_lowercase(text):
+    """classify() of text that is already a lowercase string"""
+    color = Color.UNKNOWN
+    length, length_rank = Length.STANDARD, len(LENGTH_TERMS)
+    materials = []
+    size = None
+    for match in ATTRIBUTE_PATTERN.finditer(text):
+        term = match.group("term")
+        if term is None:
+            if size is None:
+                size = match.group("size") or match.group("region_size")
+                size = size.upper() if size.isalpha() else size
+            continue
+
+        attribute, value, rank = TERMS[term]
+        if attribute == "color":
+            if color is Color.UNKNOWN:
+                color = value
+        elif attribute == "length":
+            if rank < length_rank:
+                length, length_rank = value, rank
+        elif value not in materials:
+            materials.append(value)
+
+    return TextAttributes(color, length, tuple(materials), size)
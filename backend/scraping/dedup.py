@@ -0,0 +1,115 @@
+"""
+Cross-source product deduplication.
+
+Scrapers collect raw products from several sources (captured API responses,
+structured data, page state), so the same garment often turns up more than
+once, and every color of a garment may be listed as its own item.
+merge_products collapses raw products that share an identity key, filling
+empty fields from each source, and groups color variants under one item
+before anything is standardized.
+"""
+
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Query parameters that never identify a product
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "ref", "source")
+
+def canonical_url(url):
+    """
+    Normalize a product URL for comparison.
+
+    The scheme, fragment, trailing slash and tracking parameters are dropped
+    and the host is lowercased; other query parameters (such as a color
+    variant id) are kept, sorted.
+    """
+    if not isinstance(url, str) or not url.strip():
+        return ""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    canonical = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return f"{canonical}?{urlencode(query)}" if query else canonical
+
+def is_empty(value):
+    """Whether a raw field holds no information"""
+    return value is None or value == "" or value == [] or value == {}
+
+def fill_missing(target, source):
+    """Copy fields from source into target where target has nothing"""
+    for key, value in source.items():
+        if not is_empty(value) and is_empty(target.get(key)):
+            target[key] = value
+
+def merge_products(products, identity_keys, variant_key=None, colors_of=None):
+    """
+    Merge duplicate raw products and group their color variants.
+
+    Args:
+        products: Raw product dicts, best source first
+        identity_keys: Function returning the keys that identify a raw product,
+            e.g. ("id", 123) or ("url", ...); falsy keys are ignored and
+            products sharing any key, directly or through other products,
+            are merged
+        variant_key: Optional function returning the key shared by all colors
+            of a product, e.g. its base reference
+        colors_of: Function returning a raw product's color names; required
+            with variant_key
+
+    Returns:
+        The merged raw products in first-seen order; grouped products carry a
+        "colors" list with every variant's colors
+    """
+    # Union-find over the products: any shared key joins two groups, so a
+    # product linking two earlier ones merges them whatever the input order
+    products = list(products)
+    parent = list(range(len(products)))
+
+    def root(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    owner = {}
+    for index, product in enumerate(products):
+        for key in identity_keys(product):
+            if not key or not key[-1]:
+                continue
+            if key in owner:
+                # The earlier product's root stays the root, keeping first-seen order
+                first, second = sorted((root(owner[key]), root(index)))
+                parent[second] = first
+            else:
+                owner[key] = index
+
+    merged = []
+    by_root = {}
+    for index, product in enumerate(products):
+        group = root(index)
+        target = by_root.get(group)
+        if target is None:
+            target = by_root[group] = dict(product)
+            merged.append(target)
+        else:
+            fill_missing(target, product)
+
+    if variant_key is None:
+        return merged
+
+    grouped = []
+    by_variant = {}
+    for product in merged:
+        key = variant_key(product)
+        group = by_variant.get(key) if key else None
+        colors = [color for color in colors_of(product) if color]
+        if group is None:
+            product["colors"] = list(dict.fromkeys(colors))
+            grouped.append(product)
+            if key:
+                by_variant[key] = product
+        else:
+            group["colors"] = list(dict.fromkeys(group["colors"] + colors))
+            fill_missing(group, product)
+    return grouped
@@ -0,0 +1,410 @@
+import os
+import random
+import asyncio
+import logging
+import traceback
+from .browser import BrowserPool
+from .cache import ResultCache
+from .capture import ResponseCapture
+from .models import Product
+from .schema import enforce_schema
+
+logger = logging.getLogger(__name__)
+
+# Load the simplified fallback term in a parallel tab instead of after the full term fails
+SPECULATIVE_FALLBACK = os.environ.get("SPECULATIVE_FALLBACK", "1") == "1"
+# Scroll steps before fetching further result pages directly when a limit is given
+PAGED_SCROLL_STEPS = int(os.environ.get("PAGED_SCROLL_STEPS", 2))
+# How long scrape results are reused (seconds, 0 disables) and how many are kept
+SCRAPE_CACHE_TTL = int(os.environ.get("SCRAPE_CACHE_TTL", 600))
+SCRAPE_CACHE_SIZE = int(os.environ.get("SCRAPE_CACHE_SIZE", 256))
+# Stop scrolling after this many steps bring no new streamed products (0 never stops early)
+SCROLL_IDLE_STEPS = int(os.environ.get("SCROLL_IDLE_STEPS", 3))
+
+def parse_limit(payload):
+    """Read an optional positive integer 'limit' from a request payload"""
+    try:
+        limit = int(payload.get("limit") or 0)
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+def get_search_string(clothing_attributes):
+    """Pick the search string for a scrape request, falling back to color + clothing type"""
+    # Try to get the search string first
+    search_string = clothing_attributes.get("attributes", {}).get("search_string", "")
+
+    # If no search string is provided, fall back to color + clothing_type
+    if not search_string:
+        clothing_type = clothing_attributes.get("clothing_type", "")
+        color = clothing_attributes.get("attributes", {}).get("color", "")
+        search_string = f"{color} {clothing_type}".strip()
+
+    # If we still don't have a search string, use a default
+    return search_string or "clothing"
+
+
+class ScrapeEngine:
+    """
+    Runs searches for one retailer adapter.
+
+    The engine drives the generic part of every scrape: a pooled browser,
+    one tab per search term, response capture, human-like pacing, the
+    simplified-term fallback, result caching and metrics. The adapter only
+    builds URLs and turns a loaded page into products.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.metrics = adapter.metrics
+        self.cache = ResultCache(SCRAPE_CACHE_TTL, SCRAPE_CACHE_SIZE)
+        self.browsers = BrowserPool(adapter, self.metrics)
+
+    #########################
+    # PAGE HANDLING
+    #########################
+
+    async def navigate(self, page, url):
+        """Load url, trying the adapter's navigation strategies in order"""
+        logger.info(f"Loading URL: {url}")
+        strategies = self.adapter.navigation_strategies
+        for attempt, (wait_until, timeout) in enumerate(strategies):
+            try:
+                with self.metrics.timer("navigation"):
+                    if wait_until:
+                        await page.goto(url, timeout=timeout, wait_until=wait_until)
+                    else:
+                        await page.goto(url, timeout=timeout)
+                logger.info(f"Page loaded with {wait_until or 'no wait'} strategy")
+                return
+            except Exception as nav_error:
+                if attempt == len(strategies) - 1:
+                    raise
+                logger.warning(f"{wait_until} navigation failed: {nav_error}")
+
+    async def warm_up(self, page):
+        # Add random wait time to simulate human behavior
+        await asyncio.sleep(random.random() * 1.1)
+
+        # Simulate mouse movement
+        await page.mouse.move(100 + random.randint(0, 200), 100 + random.randint(0, 100))
+        await asyncio.sleep(random.random())
+
+    async def accept_cookies(self, page):
+        """Dismiss the cookie banner if one is showing"""
+        try:
+            # First check if there's any cookie banner visible
+            cookie_visible = await page.evaluate("""() => {
+                return document.body.innerText.includes('cookie') ||
+                       document.body.innerText.includes('Cookie') ||
+                       document.body.innerText.includes('Accept') ||
+                       document.body.innerText.includes('ACCEPT');
+            }""")
+            if not cookie_visible:
+                return
+
+            logger.info("Cookie-related text found on page, attempting to accept...")
+
+            # Try clicking elements that look like cookie buttons
+            for selector in self.adapter.cookie_selectors:
+                try:
+                    if await page.locator(selector).count() > 0:
+                        logger.info(f"Found cookie button with selector: {selector}")
+                        await page.locator(selector).click(timeout=5000)
+                        logger.info(f"Clicked {selector} button")
+                        await asyncio.sleep(self.adapter.cookie_click_pause)
+                        break
+                except Exception as click_error:
+                    logger.warning(f"Could not click {selector}: {str(click_error)}")
+
+            # If no specific selector worked, try a more generic approach
+            if self.adapter.accept_dialogs and (
+                await page.locator("dialog").count() > 0 or await page.locator("[role='dialog']").count() > 0
+            ):
+                logger.info("Found a dialog, trying to accept it generically")
+                try:
+                    # Click any button that looks like an accept button
+                    await page.evaluate("""() => {
+                        const buttons = Array.from(document.querySelectorAll('button'));
+                        const acceptButton = buttons.find(button =>
+                            button.innerText.toLowerCase().includes('accept') ||
+                            button.innerText.toLowerCase().includes('agree') ||
+                            button.innerText.toLowerCase().includes('continue'));
+                        if (acceptButton) acceptButton.click();
+                    }""")
+                    await asyncio.sleep(0.76)
+                except Exception as e:
+                    logger.warning(f"Generic dialog handling failed: {e}")
+        except Exception as e:
+            logger.warning(f"Cookie handling error: {e}")
+
+    async def wait_until_ready(self, page):
+        if self.adapter.ready_selector:
+            logger.info("Waiting for content to load...")
+            try:
+                await page.wait_for_selector(self.adapter.ready_selector, timeout=10000)
+                logger.info("Product links detected on page")
+            except Exception as wait_error:
+                # Continue execution even if we don't see products yet
+                logger.warning(f"Timeout waiting for products: {str(wait_error)}")
+
+        if self.adapter.settle_pause:
+            await asyncio.sleep(self.adapter.settle_pause)
+
+    async def scroll(self, page, capture, limit=None):
+        """
+        Scroll down gradually to trigger lazy loading.
+
+        When the adapter streams extraction, the running count of unique
+        products (see RetailerAdapter.product_key) ends the scroll early: once
+        there are limit products, or once SCROLL_IDLE_STEPS steps in a row
+        brought no new ones.
+        """
+        logger.info("Scrolling to trigger lazy loading...")
+        # With a limit, further pages are fetched directly, so a short scroll is enough
+        scroll_steps = PAGED_SCROLL_STEPS if limit else self.adapter.scroll_steps
+        idle_steps = 0
+        for i in range(scroll_steps):
+            product_count = capture.product_count
+            if limit and product_count >= limit:
+                logger.info(f"Stopping scroll with {product_count} products already extracted")
+                self.metrics.incr("scrolls_stopped_early")
+                break
+
+            # Scroll down with a natural speed
+            scroll_amount = self.adapter.scroll_amount + random.randint(200, 400)
+            await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
+
+            # Random wait between scrolls
+            await asyncio.sleep(random.random() * self.adapter.scroll_pause)
+
+            # Occasionally move the mouse while scrolling to look more human
+            if random.random() > 0.6:
+                await page.mouse.move(random.randint(100, 800), random.randint(200, 600))
+
+            # Only count idle steps once products have started to arrive
+            idle_steps = idle_steps + 1 if product_count and capture.product_count == product_count else 0
+            if SCROLL_IDLE_STEPS and idle_steps >= SCROLL_IDLE_STEPS:
+                logger.info(f"Stopping scroll after {idle_steps} steps without new products")
+                self.metrics.incr("scrolls_stopped_early")
+                break
+
+        # Wait a moment after scrolling
+        await asyncio.sleep(self.adapter.after_scroll_pause)
+
+    #########################
+    # SEARCH FLOW
+    #########################
+
+    async def scrape_tab(self, context, search_term, limit=None):
+        """
+        Scrape one search term in its own tab of a shared browser context.
+
+        Args:
+            context: The browser context to open the tab in
+            search_term: The search term to look for (e.g., "black skirt")
+            limit: Optional number of products wanted
+
+        Returns:
+            A list of standardized product dictionaries
+        """
+        search_url = self.adapter.build_search_url(search_term)
+        logger.info(f"Scraping {self.adapter.display_name} with URL: {search_url}")
+        self.metrics.incr("tabs")
+
+        # Streaming adapters extract each response on a worker thread as it arrives
+        extract = self.adapter.extract_response if self.adapter.stream_extraction else None
+        capture = ResponseCapture(self.adapter.capture_patterns, extract=extract, key=self.adapter.product_key)
+        page = await context.new_page()
+        try:
+            with self.metrics.timer("tab"):
+                # Set up network request interception to capture API responses
+                capture.attach(page)
+
+                await self.navigate(page, search_url)
+                if self.adapter.warm_up:
+                    await self.warm_up(page)
+                await self.accept_cookies(page)
+                await self.wait_until_ready(page)
+                await self.scroll(page, capture, limit)
+
+                with self.metrics.timer("extraction"):
+                    await capture.drain()
+                    products = await self.adapter.extract_products(page, capture, search_term, limit)
+                # Only standardized fields leave the scraper
+                products = [enforce_schema(product) for product in products if isinstance(product, (Product, dict))]
+        except Exception:
+            self.metrics.incr("tab_errors")
+            raise
+        finally:
+            # Close the tab; the browser is shared with other search terms
+            capture.cancel()
+            await page.close()
+
+        self.metrics.incr("products", len(products))
+        logger.info(f"Returning {len(products)} products")
+        return products
+
+    async def scrape_term(self, context, search_term, limit=None):
+        """
+        Scrape one search term, falling back to a simplified two-word term.
+
+        In speculative mode the simplified term loads in a parallel tab while the
+        full term is scraped; whichever result is not needed gets cancelled, so an
+        empty search costs one scrape instead of two.
+
+        Args:
+            context: The browser context to open tabs in
+            search_term: The search term to look for (e.g., "black skirt")
+            limit: Optional number of products wanted
+
+        Returns:
+            A list of standardized product dictionaries
+        """
+        # A simpler search term (just first word or two)
+        simple_term = " ".join(search_term.split()[:2])
+        if simple_term == search_term:
+            return await self.scrape_tab(context, search_term, limit)
+
+        simple_task = None
+        if SPECULATIVE_FALLBACK:
+            simple_task = asyncio.create_task(self.scrape_tab(context, simple_term, limit))
+
+        try:
+            try:
+                products = await self.scrape_tab(context, search_term, limit)
+            except Exception as e:
+                logger.error(f"Error scraping '{search_term}': {str(e)}")
+                products = []
+
+            if products:
+                return products
+
+            logger.warning(f"No products found for '{search_term}'. Using simplified search term: '{simple_term}'")
+            self.metrics.incr("fallbacks")
+            if simple_task is None:
+                return await self.scrape_tab(context, simple_term, limit)
+            return await simple_task
+        finally:
+            # Cancel the losing tab and let it close its page
+            if simple_task is not None and not simple_task.done():
+                simple_task.cancel()
+                await asyncio.gather(simple_task, return_exceptions=True)
+
+    async def scrape_in_context(self, context, search_terms, limit=None):
+        """Scrape several search terms concurrently as tabs in one browser context"""
+        outcomes = await asyncio.gather(
+            *(self.scrape_term(context, term, limit) for term in search_terms),
+            return_exceptions=True
+        )
+        results = {}
+        for term, outcome in zip(search_terms, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error scraping '{term}': {str(outcome)}")
+                outcome = []
+            results[term] = outcome
+        return results
+
+    def cached(self, search_term, limit=None):
+        """Return cached products for a search, or None"""
+        products = self.cache.get((search_term, limit))
+        self.metrics.incr("cache_hits" if products is not None else "cache_misses")
+        return products
+
+    def scrape_terms(self, search_terms, limit=None, stop=None):
+        """
+        Scrape several search terms, reusing cached results where possible.
+
+        Must run on a scrape worker thread, which owns a pooled browser.
+
+        Args:
+            search_terms: List of search terms
+            limit: Optional number of products wanted per term
+            stop: Optional threading.Event set when the caller stops waiting
+
+        Returns:
+            Dictionary mapping each search term to its list of products
+        """
+        results = {}
+        missing = []
+        for term in dict.fromkeys(search_terms):
+            products = self.cached(term, limit)
+            if products is None:
+                missing.append(term)
+            else:
+                results[term] = products
+
+        if missing:
+            self.metrics.incr("jobs")
+            with self.metrics.timer("job"):
+                scraped = self.browsers.run(lambda context: self.scrape_in_context(context, missing, limit), stop)
+            for term, products in scraped.items():
+                # Empty results are often a blocked page, so they are not cached
+                if products:
+                    self.cache.set((term, limit), products)
+                results[term] = products
+
+        return results
+
+    def scrape_fashion_sites(self, clothing_attributes, stop=None):
+        """
+        Scrape the retailer for items matching the given attributes.
+
+        Args:
+            clothing_attributes: Dictionary with clothing attributes
+            stop: Optional threading.Event set when the caller stops waiting
+
+        Returns:
+            Dictionary with scraped fashion items
+        """
+        search_string = get_search_string(clothing_attributes)
+        logger.info(f"Using search string: {search_string}")
+
+        try:
+            limit = parse_limit(clothing_attributes)
+            products = self.scrape_terms([search_string], limit, stop).get(search_string) or []
+            logger.info(f"Found {len(products)} products from {self.adapter.display_name}")
+
+            # The simplified-term fallback already ran inside the scrape (see scrape_term)
+            return {
+                "status": True,
+                "search_term": search_string,
+                "items": products[:limit] if limit else products
+            }
+        except Exception as e:
+            logger.error(f"Error in scrape_fashion_sites: {str(e)}")
+            logger.error(traceback.format_exc())
+
+            # Return empty list with success status (don't propagate error)
+            return {
+                "status": True,
+                "search_term": search_string,
+                "items": []
+            }
+
+    def scrape_fashion_batch(self, search_terms, limit=None, stop=None):
+        """
+        Scrape several search terms in one browser session, one tab per term.
+
+        Args:
+            search_terms: List of search strings
+            limit: Optional number of products wanted per term
+            stop: Optional threading.Event set when the caller stops waiting
+
+        Returns:
+            Dictionary with per-term results
+        """
+        try:
+            term_results = self.scrape_terms(search_terms, limit, stop)
+        except Exception as e:
+            logger.error(f"Error in scrape_fashion_batch: {str(e)}")
+            logger.error(traceback.format_exc())
+            term_results = {}
+
+        return {
+            "status": True,
+            "results": [
+                {"search_term": term, "items": term_results.get(term, [])[:limit] if limit else term_results.get(term, [])}
+                for term in search_terms
+            ]
+        }
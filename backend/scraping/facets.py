@@ -0,0 +1,118 @@
+"""
+Facets and facet filters over merged search results.
+
+Facet counts (retailer, color, length, price bucket) are computed in one
+pass when results are merged, and the same facet values filter the stored
+results, so clients fetch only the slice they show instead of filtering
+the full list themselves.
+"""
+
+import os
+from .pricing import major_hundredths
+
+# Facets counted for every result set, in display order
+FACETS = ("retailer", "color", "length", "price")
+
+# Upper edges of the price buckets, in major units; the last bucket is open
+PRICE_BUCKET_EDGES = tuple(
+    int(edge) for edge in os.environ.get("PRICE_BUCKET_EDGES", "25,50,100").split(",")
+)
+
+def price_buckets(edges=PRICE_BUCKET_EDGES):
+    """
+    (key, min_cents, max_cents) of each price bucket, in hundredths of the
+    major unit; max_cents is exclusive and None when open
+    """
+    buckets = []
+    low = 0
+    for edge in edges:
+        buckets.append((f"{low}-{edge}", low * 100, edge * 100))
+        low = edge
+    buckets.append((f"{low}+", low * 100, None))
+    return tuple(buckets)
+
+PRICE_BUCKETS = price_buckets()
+
+def price_bucket(price_cents, currency=None):
+    """Key of the bucket a price in the currency's minor units falls in, or None for unpriced products"""
+    if price_cents is None:
+        return None
+    price = major_hundredths(price_cents, currency)
+    for key, low, high in PRICE_BUCKETS:
+        if high is None or price < high:
+            return key
+    return None
+
+def facet_values(product):
+    """The product's value for each facet, lowercased (None when it has none)"""
+    return (
+        product.retailer.lower() if product.retailer else None,
+        product.attributes.color.value.lower(),
+        product.attributes.length.value.lower(),
+        price_bucket(product.price_cents, product.currency),
+    )
+
+def compute_facets(products):
+    """
+    Count the products under every facet value, in one pass.
+
+    Returns:
+        Dictionary of facet name -> {value: count}; price buckets are listed
+        in price order, other values by descending count
+    """
+    counts = {facet: {} for facet in FACETS}
+    for product in products:
+        for facet, value in zip(FACETS, facet_values(product)):
+            if value is not None:
+                counts[facet][value] = counts[facet].get(value, 0) + 1
+
+    facets = {
+        facet: dict(sorted(values.items(), key=lambda item: -item[1]))
+        for facet, values in counts.items() if facet != "price"
+    }
+    facets["price"] = {key: counts["price"][key] for key, _, _ in PRICE_BUCKETS if key in counts["price"]}
+    return facets
+
+def parse_filters(values):
+    """
+    Read facet filters from request values.
+
+    Args:
+        values: Query or form values; each facet name maps to one value or a
+            comma-separated list, e.g. retailer=zara&color=black,navy
+
+    Returns:
+        Dictionary of facet name -> frozenset of lowercase values, for the
+        facets that were given
+
+    Raises:
+        ValueError: If a price bucket doesn't exist
+    """
+    filters = {}
+    for facet in FACETS:
+        raw = values.get(facet)
+        if not raw:
+            continue
+        wanted = frozenset(value.strip().lower() for value in str(raw).split(",") if value.strip())
+        if facet == "price":
+            unknown = wanted - {key for key, _, _ in PRICE_BUCKETS}
+            if unknown:
+                raise ValueError(
+                    f"Unknown price bucket: {', '.join(sorted(unknown))}. "
+                    f"Use one of: {', '.join(key for key, _, _ in PRICE_BUCKETS)}"
+                )
+        if wanted:
+            filters[facet] = wanted
+    return filters
+
+def filter_products(products, filters):
+    """Products matching every facet filter (any of a facet's values); all products when there are no filters"""
+    if not filters:
+        return list(products)
+    checks = [(FACETS.index(facet), wanted) for facet, wanted in filters.items()]
+    matching = []
+    for product in products:
+        values = facet_values(product)
+        if all(values[index] in wanted for index, wanted in checks):
+            matching.append(product)
+    return matching
@@ -0,0 +1,58 @@
+"""
+Responsive product images.
+
+Retailer CDNs serve every product image at many sizes, so scrapers return
+the main image as (width, url) renditions instead of one large URL; callers
+pass thumb_width and get the narrowest rendition that still fills it.
+"""
+
+import os
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Widths offered for every product image, narrowest first
+IMAGE_WIDTHS = tuple(sorted(int(width) for width in os.environ.get("IMAGE_WIDTHS", "300,600,1024").split(",")))
+# Widest thumbnail a caller may ask for
+MAX_THUMB_WIDTH = int(os.environ.get("MAX_THUMB_WIDTH", 2048))
+
+# Placeholder for the width in an image URL template
+WIDTH_PLACEHOLDER = "{width}"
+
+def width_template(url, param):
+    """Turn an image URL into a template by setting its width query parameter to the placeholder"""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != param]
+    query.append((param, WIDTH_PLACEHOLDER))
+    # The placeholder's braces must survive the query encoding
+    return urlunsplit(parts._replace(query=urlencode(query, safe="{}")))
+
+def width_renditions(template, widths=IMAGE_WIDTHS):
+    """(width, url) renditions of an image URL template with a {width} placeholder"""
+    if not template or WIDTH_PLACEHOLDER not in template:
+        return ()
+    return tuple((width, template.replace(WIDTH_PLACEHOLDER, str(width))) for width in widths)
+
+def parse_thumb_width(value):
+    """
+    Read an optional thumb_width request parameter.
+
+    Returns:
+        The width in pixels, or None if none was given
+
+    Raises:
+        ValueError: If the value isn't a positive integer up to MAX_THUMB_WIDTH
+    """
+    if value in (None, ""):
+        return None
+    try:
+        width = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid thumb_width: {value}")
+    if not 0 < width <= MAX_THUMB_WIDTH:
+        raise ValueError(f"thumb_width must be between 1 and {MAX_THUMB_WIDTH}")
+    return width
+
+def with_thumbnails(products, width):
+    """Products with image_url set to the rendition for a thumbnail width; unchanged when width is None"""
+    if width is None:
+        return products
+    return [product.with_image_width(width) for product in products]
@@ -0,0 +1,92 @@
+import math
+import queue
+import threading
+import time
+import concurrent.futures
+
+class QueueFullError(Exception):
+    """Raised when the scrape queue can't accept another job"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Scrape queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class JobCancelledError(Exception):
+    """Raised inside a running job whose caller stopped waiting for it"""
+
+class ScrapeJobQueue:
+    """
+    Bounded queue of scrape jobs served by a fixed pool of browser workers.
+
+    Jobs are rejected immediately when the queue is full instead of piling up
+    behind a browser that is already busy.
+    """
+
+    def __init__(self, workers, max_size):
+        self.workers = workers
+        self.jobs = queue.Queue(maxsize=max_size)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.last_wait = 0.0
+        self.avg_wait = 0.0
+        self.avg_duration = 30.0  # Initial guess until the first job finishes
+
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"scrape-worker-{i}", daemon=True).start()
+
+    def submit(self, func, *args):
+        """Queue func(*args) and return a Future; raises QueueFullError when full"""
+        future = concurrent.futures.Future()
+        try:
+            self.jobs.put_nowait((future, time.monotonic(), func, args))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            raise QueueFullError(self.retry_after())
+        return future
+
+    def retry_after(self):
+        """Estimate in seconds until a queue slot frees up"""
+        with self.lock:
+            backlog = self.jobs.qsize() + self.active
+            return max(1, math.ceil(backlog * self.avg_duration / self.workers))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queue_depth": self.jobs.qsize(),
+                "queue_size": self.jobs.maxsize,
+                "workers": self.workers,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "last_wait_ms": int(self.last_wait * 1000),
+                "avg_wait_ms": int(self.avg_wait * 1000),
+                "avg_duration_ms": int(self.avg_duration * 1000)
+            }
+
+    def _worker(self):
+        while True:
+            future, enqueued_at, func, args = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started_at = time.monotonic()
+            wait = started_at - enqueued_at
+            future.queue_wait = wait
+            with self.lock:
+                self.active += 1
+                self.last_wait = wait
+                self.avg_wait = 0.8 * self.avg_wait + 0.2 * wait
+
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - started_at)
@@ -0,0 +1,51 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ScrapeMetrics:
+    """
+    Thread-safe counters and timings for one scraper service.
+
+    Every retailer records the same names, so their /health output can be
+    compared side by side.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self.lock:
+            timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the wrapped block and record it under name"""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started_at)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {
+                    name: {
+                        "count": timing["count"],
+                        "avg_ms": int(timing["total"] / timing["count"] * 1000),
+                        "max_ms": int(timing["max"] * 1000)
+                    }
+                    for name, timing in self.timings.items()
+                }
+            }
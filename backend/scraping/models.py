@@ -0,0 +1,500 @@
+"""
+Compact product model shared by the scrapers and the backend.
+
+Products are slotted objects rather than nested dicts: prices are integer
+cents, availability/length/color are enums, and each product memoizes its
+own JSON so cached results are serialized once, not on every response.
+"""
+
+import re
+import json
+from enum import Enum
+from json.encoder import encode_basestring_ascii as quote
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; without it only JSON is offered
+    msgpack = None
+
+CURRENCY_SYMBOLS = {"EUR": "€", "USD": "$", "GBP": "£"}
+SYMBOL_CURRENCIES = {symbol: code for code, symbol in CURRENCY_SYMBOLS.items()}
+# Decimal places of currencies whose minor unit isn't a hundredth
+CURRENCY_EXPONENTS = {"JPY": 0, "KRW": 0, "HUF": 0}
+PRICE_NUMBER = re.compile(r'\d[\d.,]*')
+
+# Top-level product fields in to_dict() order, and the fields inside "attributes"
+PRODUCT_FIELDS = (
+    "name", "brand", "category", "size", "availability", "price", "price_cents", "currency",
+    "image_url", "product_url", "attributes", "colors", "images"
+)
+ATTRIBUTE_FIELDS = ("color", "material", "style", "length", "color_name")
+
+
+class Availability(str, Enum):
+    AVAILABLE = "Available"
+    UNAVAILABLE = "Unavailable at the moment"
+    UNKNOWN = "Unknown"
+
+    @classmethod
+    def parse(cls, value):
+        if isinstance(value, cls):
+            return value
+        text = str(value or "").strip().lower()
+        if not text or text == "unknown":
+            return cls.UNKNOWN
+        if "unavailable" in text or "out of stock" in text or "sold out" in text:
+            return cls.UNAVAILABLE
+        return cls.AVAILABLE
+
+
+class Length(str, Enum):
+    MINI = "mini"
+    MIDI = "midi"
+    MAXI = "maxi"
+    KNEE_LENGTH = "knee-length"
+    STANDARD = "Standard"
+
+    @classmethod
+    def parse(cls, value):
+        if isinstance(value, cls):
+            return value
+        text = str(value or "").strip().lower()
+        for length, terms in LENGTH_TERMS:
+            if any(term in text for term in terms):
+                return length
+        return cls.STANDARD
+
+
+# Checked in order; the first length with a matching term wins
+LENGTH_TERMS = (
+    (Length.MINI, ('mini', 'short')),
+    (Length.MIDI, ('midi', 'medium', 'mid-length', 'mid length', 'mid-level')),
+    (Length.MAXI, ('maxi', 'long', 'full-length', 'full length', 'floor-length')),
+    (Length.KNEE_LENGTH, ('knee',)),
+)
+
+
+class Color(str, Enum):
+    BLACK = "Black"
+    WHITE = "White"
+    RED = "Red"
+    BLUE = "Blue"
+    GREEN = "Green"
+    YELLOW = "Yellow"
+    PURPLE = "Purple"
+    PINK = "Pink"
+    ORANGE = "Orange"
+    BROWN = "Brown"
+    GRAY = "Gray"
+    BEIGE = "Beige"
+    NAVY = "Navy"
+    TEAL = "Teal"
+    CREAM = "Cream"
+    ANTHRACITE = "Anthracite"
+    IVORY = "Ivory"
+    SILVER = "Silver"
+    GOLD = "Gold"
+    BURGUNDY = "Burgundy"
+    MAROON = "Maroon"
+    OLIVE = "Olive"
+    UNKNOWN = "Unknown"
+
+    @classmethod
+    def parse(cls, value):
+        """Map a color name, or text mentioning one, to a Color"""
+        if isinstance(value, cls):
+            return value
+        text = str(value or "").strip().lower()
+        if not text:
+            return cls.UNKNOWN
+        color = COLOR_NAMES.get(text)
+        if color:
+            return color
+        # Check more specific names first, e.g. "navy" before "blue"
+        for name, color in COLOR_SEARCH_ORDER:
+            if name in text:
+                return color
+        return cls.UNKNOWN
+
+
+COLOR_NAMES = {color.value.lower(): color for color in Color if color is not Color.UNKNOWN}
+COLOR_NAMES["grey"] = Color.GRAY
+COLOR_SEARCH_ORDER = sorted(COLOR_NAMES.items(), key=lambda item: -len(item[0]))
+
+
+def parse_price(value):
+    """
+    Parse a price into integer cents and an ISO currency code.
+
+    Args:
+        value: A display string such as "€29.90" or "$1,299.00", or a number
+            in major units
+
+    Returns:
+        A (cents, currency) tuple; cents is None if no price was found and
+        currency is None if it couldn't be told from the value
+    """
+    if isinstance(value, bool) or value is None:
+        return None, None
+    if isinstance(value, (int, float)):
+        return int(round(value * 100)), None
+
+    text = str(value)
+    currency = next((code for symbol, code in SYMBOL_CURRENCIES.items() if symbol in text), None)
+    match = PRICE_NUMBER.search(text)
+    if not match:
+        return None, currency
+
+    number = match.group(0).rstrip('.,')
+    # The last separator is the decimal point only if one or two digits follow it
+    last = max(number.rfind('.'), number.rfind(','))
+    if last != -1 and 0 < len(number) - last - 1 <= 2:
+        whole, fraction = number[:last], number[last + 1:]
+    else:
+        whole, fraction = number, ""
+    whole = whole.replace('.', '').replace(',', '') or "0"
+    return int(whole) * 100 + int(fraction.ljust(2, '0')), currency
+
+def parse_colors(values):
+    """Parse color names into a tuple of distinct known Colors, in order"""
+    colors = dict.fromkeys(Color.parse(value) for value in values or ())
+    colors.pop(Color.UNKNOWN, None)
+    return tuple(colors)
+
+def parse_images(values):
+    """
+    Parse image renditions into a tuple of (width, url) pairs, narrowest first.
+
+    Args:
+        values: (width, url) pairs or {"width": ..., "url": ...} dicts; entries
+            without a positive width or a URL are dropped
+    """
+    renditions = {}
+    for value in values or ():
+        if isinstance(value, dict):
+            value = (value.get("width"), value.get("url"))
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            continue
+        width, url = value
+        if isinstance(width, int) and not isinstance(width, bool) and width > 0 and isinstance(url, str) and url:
+            renditions[width] = url
+    return tuple(sorted(renditions.items()))
+
+def format_price(cents, currency):
+    """Format an amount in minor units as a display price, e.g. "€29.90" or "JPY 3990" """
+    if cents is None:
+        return "Price not available"
+    symbol = CURRENCY_SYMBOLS.get(currency, f"{currency} " if currency else "")
+    exponent = CURRENCY_EXPONENTS.get(currency, 2)
+    return f"{symbol}{cents / 10 ** exponent:.{exponent}f}"
+
+
+class ProductAttributes:
+    __slots__ = ("color", "material", "style", "length", "color_name")
+
+    def __init__(self, color=Color.UNKNOWN, material="", style="", length=Length.STANDARD, color_name=""):
+        self.color = color
+        self.material = material
+        self.style = style
+        self.length = length
+        # The retailer's own name for the color ("Ecru", "Light khaki"); color
+        # is the closest Color, UNKNOWN when the name isn't one
+        self.color_name = color_name
+
+    def to_dict(self):
+        return {
+            "color": self.color.value,
+            "material": self.material,
+            "style": self.style,
+            "length": self.length.value,
+            "color_name": self.color_name
+        }
+
+
+class Product:
+    """
+    A standardized product.
+
+    Products are treated as immutable once built, which is what makes the
+    memoized JSON in to_json safe.
+    """
+
+    __slots__ = (
+        "name", "brand", "category", "size", "availability", "price_cents", "currency",
+        "image_url", "product_url", "attributes", "colors", "images", "retailer", "score",
+        "_json", "_msgpack"
+    )
+
+    def __init__(self, name, brand, category, size, availability, price_cents, currency,
+                 image_url, product_url, attributes, colors=(), images=(), retailer=None, score=None):
+        self.name = name
+        self.brand = brand
+        self.category = category
+        self.size = size
+        self.availability = availability
+        self.price_cents = price_cents
+        self.currency = currency
+        self.image_url = image_url
+        self.product_url = product_url
+        self.attributes = attributes
+        # Every color the product comes in, when its color variants were grouped
+        self.colors = colors
+        # Sizes of the main image as (width, url) pairs, narrowest first
+        self.images = images
+        self.retailer = retailer
+        # Relevance to the search, set when results are ranked
+        self.score = score
+        self._json = None
+        self._msgpack = None
+
+    @property
+    def price(self):
+        """Display price, e.g. "€29.90" """
+        return format_price(self.price_cents, self.currency)
+
+    def image_for_width(self, width):
+        """URL of the narrowest image rendition at least width pixels wide (else the widest), or image_url"""
+        if not self.images:
+            return self.image_url
+        return next((url for rendition_width, url in self.images if rendition_width >= width), self.images[-1][1])
+
+    def with_image_width(self, width):
+        """Copy of the product whose image_url is the rendition for a width (the product itself if unchanged)"""
+        image_url = self.image_for_width(width)
+        if image_url == self.image_url:
+            return self
+        return self.replace(image_url=image_url)
+
+    def replace(self, **changes):
+        """Copy of the product with some fields changed; the copy memoizes its own encodings"""
+        values = {field: getattr(self, field) for field in self.__slots__ if not field.startswith("_")}
+        values.update(changes)
+        return Product(**values)
+
+    def field_value(self, field):
+        """Value of one schema field ("name", "attributes.color", ...) as it appears in JSON"""
+        if field.startswith("attributes."):
+            value = getattr(self.attributes, field[len("attributes."):])
+            return value.value if isinstance(value, Enum) else value
+        if field == "attributes":
+            return self.attributes.to_dict()
+        if field == "colors":
+            return [color.value for color in self.colors]
+        if field == "images":
+            return [{"width": width, "url": url} for width, url in self.images]
+        value = getattr(self, field)
+        return value.value if isinstance(value, Enum) else value
+
+    def to_dict(self, fields=None):
+        """Plain-dict form of the product, optionally only the given fields"""
+        if fields:
+            data = {}
+            for field in fields:
+                if field.startswith("attributes."):
+                    data.setdefault("attributes", {})[field[len("attributes."):]] = self.field_value(field)
+                else:
+                    data[field] = self.field_value(field)
+        else:
+            data = {
+                "name": self.name,
+                "brand": self.brand,
+                "category": self.category,
+                "size": self.size,
+                "availability": self.availability.value,
+                "price": self.price,
+                "price_cents": self.price_cents,
+                "currency": self.currency,
+                "image_url": self.image_url,
+                "product_url": self.product_url,
+                "attributes": self.attributes.to_dict(),
+                "colors": [color.value for color in self.colors],
+                "images": [{"width": width, "url": url} for width, url in self.images]
+            }
+        if self.retailer:
+            data["retailer"] = self.retailer
+        if self.score is not None:
+            data["score"] = self.score
+        return data
+
+    def json_parts(self):
+        """JSON text of every field, in PART_INDEX/ATTRIBUTE_INDEX order"""
+        attributes = self.attributes
+        # The enums are str subclasses, so they quote as their value
+        return (
+            quote(self.name), quote(self.brand), quote(self.category), quote(self.size),
+            quote(self.availability), quote(self.price),
+            "null" if self.price_cents is None else str(self.price_cents),
+            "null" if self.currency is None else quote(self.currency),
+            quote(self.image_url), quote(self.product_url),
+            quote(attributes.color), quote(attributes.material), quote(attributes.style), quote(attributes.length),
+            "[" + ",".join(quote(color) for color in self.colors) + "]",
+            "[" + ",".join(f'{{"width":{width},"url":{quote(url)}}}' for width, url in self.images) + "]",
+            quote(attributes.color_name)
+        )
+
+    def to_json(self, fields=None):
+        """JSON text of to_dict(fields), memoized for the last field list used; fields must be a tuple"""
+        memo = self._json
+        if memo is not None and memo[0] == fields:
+            return memo[1]
+        text = product_template(fields).format(*self.json_parts())
+        if self.retailer:
+            text += ',"retailer":' + quote(self.retailer)
+        if self.score is not None:
+            text += ',"score":' + json.dumps(self.score)
+        text += "}"
+        self._json = (fields, text)
+        return text
+
+    def to_msgpack(self, fields=None):
+        """msgpack bytes of to_dict(fields), memoized like to_json"""
+        memo = self._msgpack
+        if memo is not None and memo[0] == fields:
+            return memo[1]
+        packed = msgpack.packb(self.to_dict(fields))
+        self._msgpack = (fields, packed)
+        return packed
+
+    @classmethod
+    def from_dict(cls, data, retailer=None):
+        """Build a product from its dict form (or a scraper's raw standardized dict)"""
+        attributes = data.get("attributes")
+        if not isinstance(attributes, dict):
+            attributes = {}
+        color = Color.parse(attributes.get("color"))
+        color_name = as_text(attributes.get("color_name")) or as_text(attributes.get("color"))
+        if color_name.lower() == Color.UNKNOWN.value.lower():
+            color_name = ""
+
+        colors = data.get("colors")
+        if not isinstance(colors, (list, tuple)):
+            colors = ()
+        images = data.get("images")
+        if not isinstance(images, (list, tuple)):
+            images = ()
+
+        price_cents = data.get("price_cents")
+        currency = data.get("currency")
+        if not isinstance(price_cents, int) or isinstance(price_cents, bool):
+            price_cents, parsed_currency = parse_price(data.get("price"))
+            currency = currency or parsed_currency
+
+        return cls(
+            as_text(data.get("name"), "Unknown Product"),
+            as_text(data.get("brand")),
+            as_text(data.get("category")),
+            as_text(data.get("size"), "Standard"),
+            Availability.parse(data.get("availability")),
+            price_cents,
+            currency if isinstance(currency, str) else None,
+            as_text(data.get("image_url")),
+            as_text(data.get("product_url")),
+            ProductAttributes(
+                color,
+                as_text(attributes.get("material")),
+                as_text(attributes.get("style")),
+                Length.parse(attributes.get("length")),
+                color_name
+            ),
+            colors=parse_colors(colors),
+            images=parse_images(images),
+            retailer=retailer or data.get("retailer")
+        )
+
+
+#########################
+# FAST JSON ENCODING
+#########################
+
+# Position of each schema field in Product.json_parts()
+PART_INDEX = {
+    "name": 0, "brand": 1, "category": 2, "size": 3, "availability": 4, "price": 5,
+    "price_cents": 6, "currency": 7, "image_url": 8, "product_url": 9, "colors": 14,
+    "images": 15
+}
+ATTRIBUTE_INDEX = {"color": 10, "material": 11, "style": 12, "length": 13, "color_name": 16}
+
+# Compiled templates by field list; callers use a handful of field lists
+_templates = {}
+
+def product_template(fields=None):
+    """
+    Build (once per field list) the str.format template for a Product's JSON.
+
+    The template refers to Product.json_parts() by position, so encoding a
+    product is one tuple of C-level string escapes and one format call.
+    """
+    template = _templates.get(fields)
+    if template is not None:
+        return template
+
+    top_level = []
+    attribute_names = []
+    for field in fields or PRODUCT_FIELDS:
+        if field == "attributes":
+            attribute_names.extend(name for name in ATTRIBUTE_INDEX if name not in attribute_names)
+        elif field.startswith("attributes."):
+            if field[len("attributes."):] not in attribute_names:
+                attribute_names.append(field[len("attributes."):])
+        else:
+            top_level.append(field)
+            continue
+        if "attributes" not in top_level:
+            top_level.append("attributes")
+
+    attributes = ",".join(f'"{name}":{{{ATTRIBUTE_INDEX[name]}}}' for name in attribute_names)
+    body = ",".join(
+        '"attributes":{{' + attributes + '}}' if field == "attributes" else f'"{field}":{{{PART_INDEX[field]}}}'
+        for field in top_level
+    )
+    template = "{{" + body
+    _templates[fields] = template
+    return template
+
+def as_text(value, default=""):
+    """Coerce a scalar to a string; anything structured becomes the default"""
+    if value is None or isinstance(value, (dict, list, tuple, set)):
+        return default
+    return str(value)
+
+def encode_value(value, fields=None):
+    """
+    Encode a JSON value that may contain Products.
+
+    Products use their memoized to_json(fields); everything else is encoded
+    by the standard json module.
+    """
+    if isinstance(value, Product):
+        return value.to_json(fields)
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            quote(str(key)) + ":" + encode_value(item, fields) for key, item in value.items()
+        ) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(
+            item.to_json(fields) if isinstance(item, Product) else encode_value(item, fields) for item in value
+        ) + "]"
+    return json.dumps(value, ensure_ascii=True, separators=(",", ":"))
+
+def encode_msgpack(value, fields=None):
+    """
+    Encode a value that may contain Products as msgpack.
+
+    Products use their memoized to_msgpack(fields); containers are framed
+    with msgpack headers around the already-packed items.
+    """
+    if isinstance(value, Product):
+        return value.to_msgpack(fields)
+    if isinstance(value, dict):
+        parts = [msgpack.Packer().pack_map_header(len(value))]
+        for key, item in value.items():
+            parts.append(msgpack.packb(str(key)))
+            parts.append(encode_msgpack(item, fields))
+        return b"".join(parts)
+    if isinstance(value, (list, tuple)):
+        parts = [msgpack.Packer().pack_array_header(len(value))]
+        parts.extend(
+            item.to_msgpack(fields) if isinstance(item, Product) else encode_msgpack(item, fields) for item in value
+        )
+        return b"".join(parts)
+    return msgpack.packb(value)
@@ -0,0 +1,87 @@
+import math
+import os
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Most extra result pages fetched in parallel for one search
+MAX_EXTRA_PAGES = int(os.environ.get("MAX_EXTRA_PAGES", 5))
+
+# Query parameters that page through a captured search API
+PAGE_PARAMS = ('page', 'pageNumber', 'pageIndex')
+OFFSET_PARAMS = ('offset', 'start', 'from')
+SIZE_PARAMS = ('limit', 'size', 'pageSize', 'rows', 'count')
+
+# Fetch API pages from inside the page so they carry the site's cookies and headers
+FETCH_JSON_JS = """async (urls) => Promise.all(urls.map(async (url) => {
+    try {
+        const response = await fetch(url, {credentials: 'include', headers: {'Accept': 'application/json'}});
+        if (!response.ok) return null;
+        return {url: url, data: await response.json()};
+    } catch (e) {
+        return null;
+    }
+}))"""
+
+# Fetch result pages from inside the page (sharing its cookies) and return their __NEXT_DATA__
+FETCH_NEXT_DATA_JS = """async (urls) => Promise.all(urls.map(async (url) => {
+    try {
+        const response = await fetch(url, {credentials: 'include'});
+        if (!response.ok) return null;
+        const doc = new DOMParser().parseFromString(await response.text(), 'text/html');
+        const scriptElement = doc.getElementById('__NEXT_DATA__');
+        return scriptElement ? scriptElement.textContent : null;
+    } catch (e) {
+        return null;
+    }
+}))"""
+
+def build_page_urls(url, page_size, needed):
+    """
+    Build URLs for the pages after a captured, paged API request.
+
+    Args:
+        url: URL of the captured API request
+        page_size: Number of products that response held
+        needed: How many more products are wanted
+
+    Returns:
+        List of page URLs (capped at MAX_EXTRA_PAGES), or an empty list if the
+        URL has no recognizable paging parameters
+    """
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+
+    page_key = next((key for key in PAGE_PARAMS if params.get(key, '').isdigit()), None)
+    offset_key = next((key for key in OFFSET_PARAMS if params.get(key, '').isdigit()), None)
+    size_key = next((key for key in SIZE_PARAMS if params.get(key, '').isdigit()), None)
+    if not page_key and not offset_key:
+        return []
+
+    step = int(params[size_key]) if size_key else page_size
+    pages = min(MAX_EXTRA_PAGES, math.ceil(needed / max(step, 1)))
+
+    urls = []
+    for page_number in range(1, pages + 1):
+        page_params = dict(params)
+        if page_key:
+            page_params[page_key] = str(int(params[page_key]) + page_number)
+        else:
+            page_params[offset_key] = str(int(params[offset_key]) + page_number * step)
+        urls.append(urlunsplit(parts._replace(query=urlencode(page_params))))
+    return urls
+
+def build_numbered_page_urls(search_url, page_size, needed, param="page"):
+    """
+    Build search URLs for the result pages after the first one.
+
+    Args:
+        search_url: The first page's search URL
+        page_size: Number of products the first page returned
+        needed: How many more products are wanted
+        param: Query parameter holding the 1-based page number
+
+    Returns:
+        List of page URLs, capped at MAX_EXTRA_PAGES
+    """
+    pages = min(MAX_EXTRA_PAGES, math.ceil(needed / max(page_size, 1)))
+    separator = '&' if urlsplit(search_url).query else '?'
+    return [f"{search_url}{separator}{param}={page_number}" for page_number in range(2, pages + 2)]
@@ -0,0 +1,96 @@
+import re
+import threading
+from urllib.parse import urlsplit
+
+# Digit runs in a URL path (store ids, API versions) don't change where products live
+PATH_NUMBERS = re.compile(r'\d+')
+
+def url_pattern(url):
+    """Host and path of a URL with numbers generalized and the query dropped"""
+    parts = urlsplit(url or "")
+    return f"{parts.netloc.lower()}{PATH_NUMBERS.sub('#', parts.path)}"
+
+# Stands for every index of a list in a learned path
+ANY = "*"
+
+def generalize_path(path):
+    """Path with its list indices replaced by ANY, so it covers every sibling list"""
+    return tuple(ANY if isinstance(key, int) else key for key in path)
+
+def follow_path(data, path):
+    """Return the values at a path of dict keys, list indices and ANY (every element), in document order"""
+    nodes = [data]
+    for key in path:
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and key in node:
+                found.append(node[key])
+            elif isinstance(node, list) and key == ANY:
+                found.extend(node)
+            elif isinstance(node, list) and isinstance(key, int) and 0 <= key < len(node):
+                found.append(node[key])
+        nodes = found
+    return nodes
+
+class ExtractionPathCache:
+    """
+    Remembers where in a retailer's JSON the products were found.
+
+    Paths are learned per source ("api", "initial_state", ...) and URL
+    pattern, so the next response from the same endpoint is read straight
+    from the known path; the retailer's generic walk only runs when there is
+    no path yet or the known one no longer holds products.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = {}
+        self.counters = {"hits": 0, "misses": 0, "learned": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def extract(self, source, url, data, products, walk, take):
+        """
+        Extract products from data, trying the learned path first.
+
+        Args:
+            source: Name of the kind of data, e.g. "api"
+            url: URL the data came from
+            data: The parsed JSON
+            products: List the extracted products are appended to
+            walk: Function (data, products) that searches data and returns the
+                generalized path (see generalize_path) it took products from,
+                or None
+            take: Function (node, path, products) that appends the products in
+                one node at a learned path and returns whether it found any
+
+        Returns:
+            The path products were taken from, or None
+        """
+        key = (source, url_pattern(url))
+        path = self.paths.get(key)
+        if path is not None:
+            found = False
+            for node in follow_path(data, path):
+                found = take(node, path, products) or found
+            if found:
+                self.count("hits")
+                return path
+
+        self.count("misses")
+        path = walk(data, products)
+        if path is not None:
+            with self.lock:
+                if self.paths.get(key) != path:
+                    self.paths[key] = path
+                    self.counters["learned"] += 1
+        return path
+
+    def snapshot(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                paths={f"{source} {pattern}": ".".join(map(str, path)) for (source, pattern), path in self.paths.items()}
+            )
@@ -0,0 +1,119 @@
+"""
+Price normalization for retailer data.
+
+Scrapers turn whatever a retailer sends (integer minor units, numbers in
+major units, display strings, nested price objects) into an integer amount
+in the currency's minor units plus an ISO currency code. The currency comes
+from the locale in the search URL, which is what the storefront prices in,
+rather than from guessing at symbols.
+"""
+
+import re
+from urllib.parse import urlsplit
+from .models import CURRENCY_EXPONENTS, parse_price
+
+# Storefront country -> ISO currency
+LOCALE_CURRENCIES = {
+    "us": "USD", "ca": "CAD", "mx": "MXN", "gb": "GBP", "uk": "GBP", "ie": "EUR",
+    "de": "EUR", "fr": "EUR", "es": "EUR", "it": "EUR", "nl": "EUR", "be": "EUR",
+    "at": "EUR", "pt": "EUR", "fi": "EUR", "gr": "EUR", "lu": "EUR", "sk": "EUR",
+    "si": "EUR", "ee": "EUR", "lv": "EUR", "lt": "EUR", "hr": "EUR", "cy": "EUR", "mt": "EUR",
+    "ch": "CHF", "se": "SEK", "no": "NOK", "dk": "DKK", "pl": "PLN", "cz": "CZK",
+    "hu": "HUF", "ro": "RON", "bg": "BGN", "tr": "TRY", "au": "AUD", "nz": "NZD",
+    "jp": "JPY", "kr": "KRW", "in": "INR", "sg": "SGD", "hk": "HKD", "ae": "AED",
+}
+
+# Locale path segments: "us" (Zara's /us/en/) or "en_us" (H&M's /en_us/)
+LOCALE_SEGMENT = re.compile(r'^(?:[a-z]{2}[_-])?([a-z]{2})$')
+
+# Keys a nested price object keeps its amount under, in order of preference
+PRICE_VALUE_KEYS = ('value', 'amount', 'current', 'text', 'price')
+
+def currency_for_url(url):
+    """
+    Return the ISO currency a storefront URL prices in.
+
+    Args:
+        url: A retailer URL whose first path segment is its locale, e.g.
+            https://www.zara.com/us/en/... or https://www2.hm.com/en_gb/...
+
+    Returns:
+        The currency code, or None if the URL has no known locale
+    """
+    segments = urlsplit(url or "").path.strip('/').split('/')
+    match = LOCALE_SEGMENT.match(segments[0].lower())
+    return LOCALE_CURRENCIES.get(match.group(1)) if match else None
+
+def normalize_price(value, currency=None, minor_units=False):
+    """
+    Normalize a retailer price to an integer amount in minor units.
+
+    Args:
+        value: A number, a display string such as "$ 29.99", or a dict
+            holding one under a key like "value" or "amount"
+        currency: The storefront's ISO currency; when None, the currency is
+            taken from the symbol in a display string
+        minor_units: Whether numbers are already in minor units (cents), as
+            in Zara's API; display strings are always read as major units
+
+    Returns:
+        An (amount, currency) tuple; amount is None if no price was found
+    """
+    if isinstance(value, dict):
+        currency = currency or value.get('currency') or value.get('currencyCode')
+        for key in PRICE_VALUE_KEYS:
+            if value.get(key) not in (None, ''):
+                return normalize_price(value[key], currency, minor_units)
+        return None, currency
+    if isinstance(value, bool) or value is None:
+        return None, currency
+
+    exponent = CURRENCY_EXPONENTS.get(currency, 2)
+    if isinstance(value, (int, float)):
+        if value < 0:
+            return None, currency
+        return (int(round(value)) if minor_units else int(round(value * 10 ** exponent))), currency
+
+    # parse_price reads strings into hundredths of the major unit
+    hundredths, symbol_currency = parse_price(value)
+    currency = currency or symbol_currency
+    if hundredths is None:
+        return None, currency
+    exponent = CURRENCY_EXPONENTS.get(currency, 2)
+    return hundredths * 10 ** exponent // 100, currency
+
+def major_hundredths(amount, currency):
+    """
+    An amount in a currency's minor units as hundredths of its major unit,
+    so prices in currencies without cents (JPY) or with three decimals
+    compare with major-unit bounds like the rest
+    """
+    return amount * 100 // 10 ** CURRENCY_EXPONENTS.get(currency, 2)
+
+def sort_by_price(products, descending=False):
+    """Sort products by price (see major_hundredths) in place; products without a price always go last"""
+    def price(product):
+        return major_hundredths(product.price_cents or 0, product.currency)
+
+    if descending:
+        products.sort(key=lambda product: (product.price_cents is None, -price(product)))
+    else:
+        products.sort(key=lambda product: (product.price_cents is None, price(product)))
+    return products
+
+def filter_by_price(products, min_cents=None, max_cents=None):
+    """
+    Keep products priced within [min_cents, max_cents], bounds in hundredths
+    of the major unit whatever each product's currency; with either bound
+    set, unpriced products are dropped
+    """
+    if min_cents is None and max_cents is None:
+        return list(products)
+    matching = []
+    for product in products:
+        if product.price_cents is None:
+            continue
+        price = major_hundredths(product.price_cents, product.currency)
+        if (min_cents is None or price >= min_cents) and (max_cents is None or price <= max_cents):
+            matching.append(product)
+    return matching
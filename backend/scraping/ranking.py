@@ -0,0 +1,120 @@
+"""
+Relevance ranking of merged search results.
+
+Every product is scored against the attributes the vision model read from
+the uploaded photo (type, color, length, pattern, fit, style) and against
+the price band of the results once, when they are merged; the best K are
+then picked with a heap instead of sorting the whole list, so any filtered
+slice of the scored results can be ranked cheaply.
+"""
+
+import re
+import heapq
+from .classifier import classify
+from .models import Availability, Color, Length
+
+# Score for each way a product matches the photo
+RANK_WEIGHTS = {
+    "type": 3.0,
+    "color": 2.0,
+    "variant_color": 1.0,  # the color is one of the product's other color variants
+    "length": 1.5,
+    "pattern": 1.0,
+    "fit": 0.5,
+    "style": 0.5,
+    "price": 0.5,
+    "unavailable": -1.0,
+    "photo_color": 3.0,  # times the thumbnail's color similarity to the photo (see similarity.py)
+}
+
+WORD = re.compile(r"[a-z]+")
+# Vision values that say nothing about the garment
+VAGUE_TERMS = frozenset(("solid", "plain", "none", "unknown", "regular", "standard", "n", "a", "and", "with"))
+
+def terms(text):
+    """Set of lowercase words in text, with plural s dropped so "skirts" matches "skirt" """
+    if not isinstance(text, str):
+        return frozenset()
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in WORD.findall(text.lower())
+    )
+
+
+class RankingProfile:
+    """The photo's attributes, reduced once to what products are compared against"""
+
+    __slots__ = ("type_terms", "color", "length", "pattern_terms", "fit_terms", "style_terms")
+
+    def __init__(self, clothing_data):
+        """
+        Args:
+            clothing_data: The vision analysis, with clothing_type and attributes
+        """
+        attributes = clothing_data.get("attributes")
+        if not isinstance(attributes, dict):
+            attributes = {}
+        self.type_terms = terms(clothing_data.get("clothing_type")) - VAGUE_TERMS
+        self.color = classify(str(attributes.get("color") or "")).color
+        self.length = classify(str(attributes.get("length") or "")).length
+        self.pattern_terms = terms(attributes.get("pattern")) - VAGUE_TERMS
+        self.fit_terms = terms(attributes.get("fit")) - VAGUE_TERMS
+        self.style_terms = terms(attributes.get("style")) - VAGUE_TERMS
+
+
+def price_band(products):
+    """The (low, high) cents of the middle half of the priced products, or None if there are too few"""
+    prices = sorted(product.price_cents for product in products if product.price_cents is not None)
+    if len(prices) < 4:
+        return None
+    return prices[len(prices) // 4], prices[(len(prices) * 3) // 4]
+
+def score_product(product, profile, band=None):
+    """Relevance of one product to the photo, as a sum of RANK_WEIGHTS"""
+    name_terms = terms(product.name) | terms(product.attributes.style) | terms(product.attributes.material)
+    score = 0.0
+    if profile.type_terms & name_terms:
+        score += RANK_WEIGHTS["type"]
+    if profile.color is not Color.UNKNOWN:
+        if product.attributes.color is profile.color:
+            score += RANK_WEIGHTS["color"]
+        elif profile.color in product.colors:
+            score += RANK_WEIGHTS["variant_color"]
+    if profile.length is not Length.STANDARD and product.attributes.length is profile.length:
+        score += RANK_WEIGHTS["length"]
+    if profile.pattern_terms & name_terms:
+        score += RANK_WEIGHTS["pattern"]
+    if profile.fit_terms & name_terms:
+        score += RANK_WEIGHTS["fit"]
+    if profile.style_terms & name_terms:
+        score += RANK_WEIGHTS["style"]
+    if band is not None and product.price_cents is not None and band[0] <= product.price_cents <= band[1]:
+        score += RANK_WEIGHTS["price"]
+    if product.availability is Availability.UNAVAILABLE:
+        score += RANK_WEIGHTS["unavailable"]
+    return round(score, 2)
+
+def score_products(products, clothing_data):
+    """
+    Score products against the photo.
+
+    Args:
+        products: The merged Products
+        clothing_data: The vision analysis of the photo
+
+    Returns:
+        Copies of the products with their score set, in the original order
+    """
+    profile = RankingProfile(clothing_data)
+    band = price_band(products)
+    return [product.replace(score=score_product(product, profile, band)) for product in products]
+
+def top_products(products, top_k=None):
+    """
+    The top_k highest-scored products (all of them for None or 0), best
+    first; equal scores keep their original order
+    """
+    if top_k and top_k < len(products):
+        # nlargest breaks ties by position, like a stable sort
+        return heapq.nlargest(top_k, products, key=lambda product: product.score or 0.0)
+    return sorted(products, key=lambda product: product.score or 0.0, reverse=True)
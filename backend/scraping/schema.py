@@ -0,0 +1,86 @@
+"""
+The standardized product schema every scraper returns.
+
+Retailer adapters build products with make_product; the engine runs every
+product through enforce_schema, so raw retailer data never leaves the
+scraper, and parse_fields reads the fields a caller asked for.
+"""
+
+from .models import (
+    PRODUCT_FIELDS, ATTRIBUTE_FIELDS, Product, ProductAttributes, Availability, Color, Length,
+    as_text, parse_colors, parse_images
+)
+from .pricing import normalize_price
+
+def make_product(name, brand, category="Women", size="Standard", availability="Available",
+                 price="Price not available", image_url="", product_url="",
+                 color="Unknown", material="", style="", length="Standard", colors=(),
+                 price_cents=None, currency=None, images=()):
+    """
+    Build a standardized Product from extracted values; colors lists grouped
+    color variants and images the (width, url) renditions of the image. Pass
+    price_cents when the price is already normalized, otherwise price is
+    parsed in the given (storefront) currency. The color is kept as written
+    (color_name) besides its Color, which is UNKNOWN for names like "Ecru".
+    """
+    if price_cents is None:
+        price_cents, currency = normalize_price(price, currency)
+    return Product(
+        as_text(name, "Unknown Product"),
+        as_text(brand),
+        as_text(category, "Women"),
+        as_text(size, "Standard"),
+        Availability.parse(availability),
+        price_cents,
+        currency,
+        as_text(image_url),
+        as_text(product_url),
+        ProductAttributes(
+            Color.parse(color),
+            as_text(material),
+            as_text(style),
+            Length.parse(length),
+            color_name(color)
+        ),
+        colors=parse_colors(colors),
+        images=parse_images(images)
+    )
+
+def color_name(color):
+    """A retailer's color as written, or "" when it names no color"""
+    name = color.value if isinstance(color, Color) else as_text(color).strip()
+    return "" if name.lower() in ("", Color.UNKNOWN.value.lower()) else name
+
+def enforce_schema(product):
+    """Return product as a Product built from schema fields only"""
+    if isinstance(product, Product):
+        return product
+    return Product.from_dict(product)
+
+def parse_fields(value):
+    """
+    Parse a requested field list.
+
+    Args:
+        value: List of field names or a comma-separated string; attribute
+            fields may be named "attributes.color" etc.
+
+    Returns:
+        A tuple of field names, or None for all fields
+
+    Raises:
+        ValueError: If a field is not part of the product schema
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise ValueError("fields must be a list or a comma-separated string")
+
+    fields = tuple(dict.fromkeys(str(field).strip() for field in value if str(field).strip()))
+    known = set(PRODUCT_FIELDS) | {f"attributes.{field}" for field in ATTRIBUTE_FIELDS}
+    unknown = [field for field in fields if field not in known]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
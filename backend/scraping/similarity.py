@@ -0,0 +1,212 @@
+"""
+Color-similarity reranking against the uploaded photo.
+
+The photo and every result thumbnail are reduced to a compact joint RGB
+histogram of their central region. Thumbnails are downloaded by a bounded
+concurrent fetcher (with a per-URL histogram cache), and the whole set is
+compared to the photo in one matrix-vector product of Bhattacharyya
+coefficients, added to each product's keyword score.
+"""
+
+import io
+import os
+import time
+import logging
+import concurrent.futures
+from PIL import Image
+from .cache import ResultCache
+from .ranking import RANK_WEIGHTS
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it results keep their keyword scores
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Histogram bins per RGB channel (COLOR_BINS ** 3 values per image), and the
+# edge images are shrunk to before counting
+COLOR_BINS = int(os.environ.get("COLOR_BINS", 4))
+COLOR_SAMPLE_EDGE = int(os.environ.get("COLOR_SAMPLE_EDGE", 64))
+# Share of each side kept around the center, where the garment usually is
+COLOR_CENTER_CROP = float(os.environ.get("COLOR_CENTER_CROP", 0.6))
+
+# Thumbnails fetched per find: how many of the best keyword matches (about one
+# page of results, since the find request waits for them), the rendition
+# width, parallel downloads, per-download timeout (seconds), largest body
+# read, and the time budget for the whole batch (seconds)
+COLOR_RERANK_DEPTH = int(os.environ.get("COLOR_RERANK_DEPTH", 24))
+COLOR_THUMB_WIDTH = int(os.environ.get("COLOR_THUMB_WIDTH", 300))
+COLOR_FETCH_WORKERS = int(os.environ.get("COLOR_FETCH_WORKERS", 8))
+COLOR_FETCH_TIMEOUT = float(os.environ.get("COLOR_FETCH_TIMEOUT", 1.5))
+COLOR_FETCH_MAX_BYTES = int(os.environ.get("COLOR_FETCH_MAX_BYTES", 2 * 1024 * 1024))
+COLOR_FETCH_BUDGET = float(os.environ.get("COLOR_FETCH_BUDGET", 1.5))
+
+# Thumbnail histograms by URL; the same products come back for similar photos
+COLOR_CACHE_TTL = int(os.environ.get("COLOR_CACHE_TTL", 3600))
+COLOR_CACHE_SIZE = int(os.environ.get("COLOR_CACHE_SIZE", 4096))
+
+def color_histogram(image):
+    """
+    Normalized joint RGB histogram of the center of a PIL image.
+
+    Returns:
+        A float32 vector of COLOR_BINS ** 3 values summing to 1, or None
+        without numpy
+    """
+    if np is None:
+        return None
+    # Let the JPEG decoder scale down while decoding instead of after
+    image.draft('RGB', (COLOR_SAMPLE_EDGE * 2, COLOR_SAMPLE_EDGE * 2))
+    image = image.convert('RGB')
+    width, height = image.size
+    margin_x = int(width * (1 - COLOR_CENTER_CROP) / 2)
+    margin_y = int(height * (1 - COLOR_CENTER_CROP) / 2)
+    image = image.crop((margin_x, margin_y, width - margin_x, height - margin_y))
+    image.thumbnail((COLOR_SAMPLE_EDGE, COLOR_SAMPLE_EDGE))
+
+    pixels = np.asarray(image, dtype=np.uint16).reshape(-1, 3) * COLOR_BINS // 256
+    bins = (pixels[:, 0] * COLOR_BINS + pixels[:, 1]) * COLOR_BINS + pixels[:, 2]
+    counts = np.bincount(bins, minlength=COLOR_BINS ** 3).astype(np.float32)
+    counts = smooth_histogram(counts.reshape((COLOR_BINS,) * 3)).ravel()
+    return counts / max(counts.sum(), 1.0)
+
+def smooth_histogram(counts):
+    """
+    Spread each bin over its neighbors with a [1, 2, 1] kernel along every
+    channel, so near-identical colors on either side of a bin edge still match
+    """
+    for axis in range(counts.ndim):
+        padded = np.pad(counts, [(1, 1) if index == axis else (0, 0) for index in range(counts.ndim)])
+        before = np.take(padded, range(0, counts.shape[axis]), axis=axis)
+        after = np.take(padded, range(2, counts.shape[axis] + 2), axis=axis)
+        counts = before + 2 * counts + after
+    return counts
+
+def histogram_from_file(path):
+    """Color histogram of an image file, or None if it can't be decoded"""
+    try:
+        with Image.open(path) as image:
+            return color_histogram(image)
+    except Exception as image_error:
+        logger.warning(f"Could not compute color histogram of {path}: {str(image_error)}")
+        return None
+
+def histogram_from_bytes(data):
+    """Color histogram of encoded image bytes, or None if they can't be decoded"""
+    with Image.open(io.BytesIO(data)) as image:
+        return color_histogram(image)
+
+
+class ThumbnailFetcher:
+    """
+    Downloads thumbnails and reduces them to color histograms.
+
+    At most `workers` downloads run at once, each is bounded by a timeout and
+    a body size, and a batch gives up on whatever hasn't finished within its
+    time budget. Histograms are cached by URL.
+    """
+
+    def __init__(self, session, workers=COLOR_FETCH_WORKERS, timeout=COLOR_FETCH_TIMEOUT,
+                 max_bytes=COLOR_FETCH_MAX_BYTES, budget=COLOR_FETCH_BUDGET):
+        """
+        Args:
+            session: requests.Session the thumbnails are fetched with
+            workers: Most downloads in flight
+            timeout: Connect and read timeout of each download (seconds)
+            max_bytes: Largest thumbnail read
+            budget: Longest a batch waits for its downloads (seconds)
+        """
+        self.session = session
+        self.workers = workers
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.cache = ResultCache(COLOR_CACHE_TTL, COLOR_CACHE_SIZE)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+
+    def fetch(self, url):
+        """Histogram of one thumbnail, or None if it couldn't be fetched or decoded"""
+        try:
+            # Scraped image URLs may be protocol-relative (//lp2.hm.com/...)
+            fetch_url = f"https:{url}" if url.startswith("//") else url
+            with self.session.get(fetch_url, timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                body = response.raw.read(self.max_bytes + 1, decode_content=True)
+            if len(body) > self.max_bytes:
+                logger.warning(f"Skipping thumbnail over {self.max_bytes} bytes: {url}")
+                return None
+            histogram = histogram_from_bytes(body)
+        except Exception as fetch_error:
+            logger.warning(f"Could not fetch thumbnail {url}: {str(fetch_error)}")
+            return None
+        self.cache.set(url, histogram)
+        return histogram
+
+    def histograms(self, urls):
+        """
+        Histograms of many thumbnails, fetched concurrently within the budget.
+
+        Returns:
+            Dictionary of URL -> histogram for the thumbnails that arrived in time
+        """
+        found = {}
+        pending = {}
+        for url in dict.fromkeys(urls):
+            histogram = self.cache.get(url)
+            if histogram is not None:
+                found[url] = histogram
+            elif url:
+                pending[self.executor.submit(self.fetch, url)] = url
+
+        cached = len(found)
+        started = time.monotonic()
+        try:
+            for future in concurrent.futures.as_completed(pending, timeout=self.budget):
+                histogram = future.result()
+                if histogram is not None:
+                    found[pending[future]] = histogram
+        except concurrent.futures.TimeoutError:
+            for future in pending:
+                future.cancel()
+            logger.warning(f"Thumbnail budget of {self.budget}s ran out; {len(found)} of {len(pending) + cached} histograms ready")
+        logger.info(f"Got {len(found)} thumbnail histograms ({cached} cached) in {time.monotonic() - started:.2f}s")
+        return found
+
+
+def rerank_by_color(products, photo_histogram, fetcher, depth=COLOR_RERANK_DEPTH):
+    """
+    Add the photo's color similarity to the scores of the best-scored products.
+
+    Args:
+        products: Scored Products
+        photo_histogram: color_histogram of the uploaded photo, or None
+        fetcher: ThumbnailFetcher for the product thumbnails
+        depth: How many of the best keyword matches are compared (0 for all)
+
+    Returns:
+        The products, in the same order; compared ones are copies whose score
+        includes RANK_WEIGHTS["photo_color"] times their similarity (0 to 1)
+    """
+    if np is None or photo_histogram is None or not products:
+        return products
+
+    ranked = sorted(range(len(products)), key=lambda index: products[index].score or 0.0, reverse=True)
+    candidates = ranked[:depth] if depth else ranked
+    urls = {index: products[index].image_for_width(COLOR_THUMB_WIDTH) for index in candidates}
+    histograms = fetcher.histograms(url for url in urls.values() if url)
+
+    compared = [index for index in candidates if urls[index] in histograms]
+    if not compared:
+        return products
+
+    # Bhattacharyya coefficient of every thumbnail with the photo, in one product
+    thumbnails = np.sqrt(np.stack([histograms[urls[index]] for index in compared]))
+    similarity = thumbnails @ np.sqrt(photo_histogram)
+
+    products = list(products)
+    for index, value in zip(compared, similarity.tolist()):
+        product = products[index]
+        products[index] = product.replace(score=round((product.score or 0.0) + RANK_WEIGHTS["photo_color"] * value, 2))
+    return products
@@ -0,0 +1,84 @@
+import os
+
+# Deepest path and most containers one walk visits; past these the walk gives up
+JSON_MAX_DEPTH = int(os.environ.get("JSON_MAX_DEPTH", 40))
+JSON_MAX_NODES = int(os.environ.get("JSON_MAX_NODES", 50000))
+
+# Returned by a visit function to skip a node's children
+SKIP = object()
+
+
+class JsonWalker:
+    """
+    Iterative depth-first walk over nested JSON.
+
+    The walk uses an explicit stack, so payload depth can't hit the recursion
+    limit, and every walk is bounded by a depth and a node budget. Children
+    are visited in document order, as a recursive walk would.
+    """
+
+    def __init__(self, max_depth=JSON_MAX_DEPTH, max_nodes=JSON_MAX_NODES, enough=None, metrics=None):
+        """
+        Args:
+            max_depth: Deepest path (number of keys) visited
+            max_nodes: Most dicts and lists visited per walk
+            enough: Optional function returning True once the caller has all
+                it needs; the walk stops at the next node
+            metrics: Optional ScrapeMetrics to record nodes visited and
+                truncated walks in
+        """
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.enough = enough
+        self.metrics = metrics
+
+    def walk(self, data, visit, path=()):
+        """
+        Visit every dict and list in data until visit returns a result.
+
+        Args:
+            data: The parsed JSON
+            visit: Function (node, path) returning None to continue into the
+                node's children, SKIP to pass over them, or any other value to
+                end the walk with it
+            path: Path of data within a larger document
+
+        Returns:
+            The first result returned by visit, or None
+        """
+        stack = [(data, path)]
+        nodes = 0
+        truncated = False
+        result = None
+        while stack:
+            if self.enough is not None and self.enough():
+                break
+            if nodes >= self.max_nodes:
+                truncated = True
+                break
+
+            node, node_path = stack.pop()
+            if not isinstance(node, (dict, list)):
+                continue
+            nodes += 1
+            outcome = visit(node, node_path)
+            if outcome is SKIP:
+                continue
+            if outcome is not None:
+                result = outcome
+                break
+            if len(node_path) >= self.max_depth:
+                truncated = True
+                continue
+
+            children = node.items() if isinstance(node, dict) else enumerate(node)
+            # Pushed in reverse so the first child is visited first
+            stack.extend(reversed([
+                (child, node_path + (key,)) for key, child in children if isinstance(child, (dict, list))
+            ]))
+
+        if self.metrics is not None:
+            self.metrics.incr("json_nodes_visited", nodes)
+            if truncated:
+                self.metrics.incr("json_walks_truncated")
+        return result
@@ -0,0 +1,56 @@
+"""
+Wire format between the backend and the scraper services.
+
+Scrapers answer in msgpack when the caller accepts it (and msgpack is
+installed), otherwise in JSON, and gzip large bodies for callers that accept
+gzip. The backend decodes either format with decode_response.
+"""
+
+import os
+import gzip
+import json
+from .models import msgpack, encode_value, encode_msgpack
+
+MSGPACK_MIMETYPE = "application/msgpack"
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, "application/x-msgpack")
+JSON_MIMETYPE = "application/json"
+# Accept header for callers that prefer msgpack but take JSON
+ACCEPT_HEADER = f"{MSGPACK_MIMETYPE}, {JSON_MIMETYPE};q=0.9" if msgpack else JSON_MIMETYPE
+
+# Bodies smaller than this aren't worth compressing (bytes), and the gzip level
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", 4096))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+
+def accepts_msgpack(accept_mimetypes):
+    """Whether a request's Accept header prefers msgpack over JSON"""
+    if msgpack is None:
+        return False
+    best = accept_mimetypes.best_match(MSGPACK_MIMETYPES + (JSON_MIMETYPE,), default=JSON_MIMETYPE)
+    return best in MSGPACK_MIMETYPES
+
+def encode_body(payload, fields=None, use_msgpack=False, use_gzip=False):
+    """
+    Encode a payload that may hold Products.
+
+    Returns:
+        A (body bytes, headers dict) tuple
+    """
+    if use_msgpack:
+        body = encode_msgpack(payload, fields)
+        headers = {"Content-Type": MSGPACK_MIMETYPE}
+    else:
+        body = encode_value(payload, fields).encode("ascii")
+        headers = {"Content-Type": JSON_MIMETYPE}
+
+    if use_gzip and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    headers["Vary"] = "Accept, Accept-Encoding"
+    return body, headers
+
+def decode_response(response):
+    """Decode a requests response in either wire format (gzip is undone by requests)"""
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    if content_type in MSGPACK_MIMETYPES:
+        return msgpack.unpackb(response.content)
+    return json.loads(response.content)
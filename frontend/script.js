@@ -14,12 +14,54 @@ document.addEventListener('DOMContentLoaded', function () {
   const noResults = document.getElementById('noResults');
   const uploadArea = document.querySelector('.upload-area');
 
-  // Function to replace Euro symbol with Dollar symbol and handle price format properly
-  function formatPrice(priceString) {
-    if (!priceString) return '';
+  // Use the correct URL to your backend (adjust as needed)
+  const backendBase = 'https://api.zoppl.com/api/fashion';
+  // const backendBase = 'http://localhost:5001/api/fashion';
+
+  // Id of the last find's results on the server, which serves filtered pages of them,
+  // the facet filter being shown and the cursor of its next page
+  let currentResultId = null;
+  let currentFilter = {};
+  let nextCursor = null;
+
+  // Button below the grid that fetches the next page of results
+  const loadMoreButton = document.createElement('button');
+  loadMoreButton.className = 'filter-button';
+  loadMoreButton.textContent = 'Load more';
+  loadMoreButton.style.display = 'none';
+  loadMoreButton.style.margin = '20px auto';
+  productsGrid.insertAdjacentElement('afterend', loadMoreButton);
+  loadMoreButton.addEventListener('click', function () {
+    fetchResults(currentFilter, nextCursor);
+  });
+
+  function setNextCursor(cursor) {
+    nextCursor = cursor || null;
+    loadMoreButton.style.display = nextCursor ? 'block' : 'none';
+  }
+
+  // Prices arrive formatted in the storefront's currency; hide missing ones
+  function formatPrice(product) {
+    return product.price_cents == null ? '' : product.price;
+  }
+
+  // Widest a product card image is shown, in CSS pixels
+  const CARD_IMAGE_WIDTH = 400;
+
+  // Image width to ask the backend for, so high-density screens stay sharp
+  function thumbWidth() {
+    return Math.round(CARD_IMAGE_WIDTH * (window.devicePixelRatio || 1));
+  }
 
-    // Simply replace € with $
-    return priceString.replace('€', '$');
+  function absoluteImageUrl(url) {
+    return url && url.startsWith('//') ? 'https:' + url : url || '';
+  }
+
+  // srcset of a product's image renditions, so the browser downloads the smallest that fits
+  function imageSrcset(product) {
+    return (product.images || [])
+      .map((image) => `${absoluteImageUrl(image.url)} ${image.width}w`)
+      .join(', ');
   }
 
   // Handle file selection
@@ -95,17 +137,14 @@ document.addEventListener('DOMContentLoaded', function () {
     // Prepare form data
     const formData = new FormData();
     formData.append('image', fileInput.files[0]);
+    formData.append('thumb_width', thumbWidth());
 
     // Log for debugging
     // console.log('About to send request to backend');
     // console.log('File selected:', fileInput.files[0].name);
 
-    // Use the correct URL to your backend (adjust as needed)
-    const backendUrl = 'https://api.zoppl.com/api/fashion/find';
-    // const backendUrl = 'http://localhost:5001/api/fashion/find';
-
     // Send image to backend with explicit mode
-    fetch(backendUrl, {
+    fetch(`${backendBase}/find`, {
       method: 'POST',
       body: formData,
       mode: 'cors', // Explicitly set CORS mode
@@ -172,8 +211,11 @@ document.addEventListener('DOMContentLoaded', function () {
         if (products && products.length > 0) {
           displayProducts(products);
 
-          // Show filters
-          createFilters(products);
+          // Show filters built from the server's facet counts
+          currentResultId = data.result_id || null;
+          currentFilter = {};
+          setNextCursor(data.next_cursor);
+          createFilters(data.facets || {});
           filterContainer.style.display = 'flex';
 
           // Show results title
@@ -218,6 +260,7 @@ document.addEventListener('DOMContentLoaded', function () {
     filterContainer.style.display = 'none';
     filterContainer.innerHTML = '';
     noResults.style.display = 'none';
+    setNextCursor(null);
   }
 
   function showError(message) {
@@ -418,9 +461,11 @@ document.addEventListener('DOMContentLoaded', function () {
   //   }
   // }
 
-  function displayProducts(products) {
-    // Clear previous products
-    productsGrid.innerHTML = '';
+  function displayProducts(products, append = false) {
+    // Clear previous products, unless this is the next page of them
+    if (!append) {
+      productsGrid.innerHTML = '';
+    }
 
     // Filter out products without valid images
     const validProducts = products.filter((product) => {
@@ -462,13 +507,11 @@ document.addEventListener('DOMContentLoaded', function () {
       const retailer = product.retailer || 'unknown';
 
       // Format price
-      const displayPrice = product.price ? formatPrice(product.price) : '';
+      const displayPrice = formatPrice(product);
 
-      // Format image URL
-      let imageUrl = product.image_url || '';
-      if (imageUrl && imageUrl.startsWith('//')) {
-        imageUrl = 'https:' + imageUrl;
-      }
+      // Format image URL and its renditions
+      const imageUrl = absoluteImageUrl(product.image_url);
+      const srcset = imageSrcset(product);
 
       // Set availability
       const isAvailable = product.availability
@@ -488,9 +531,11 @@ document.addEventListener('DOMContentLoaded', function () {
           product.product_url || '#'
         }" style="display: block; text-decoration: none; color: inherit;" target="_blank">
           <div style="height: 320px; overflow: hidden;">
-            <img src="${imageUrl}" alt="${
+            <img src="${imageUrl}" ${
+        srcset ? `srcset="${srcset}" sizes="(max-width: ${CARD_IMAGE_WIDTH}px) 100vw, ${CARD_IMAGE_WIDTH}px"` : ''
+      } loading="lazy" alt="${
         product.name || 'Product'
-      }" style="width: 100%; height: 100%; object-fit: cover;" onerror="this.onerror=null; this.src='placeholder.jpg';">
+      }" style="width: 100%; height: 100%; object-fit: cover;" onerror="this.onerror=null; this.srcset=''; this.src='placeholder.jpg';">
           </div>
           
           <div style="background-color: white; padding: 20px;">
@@ -501,8 +546,8 @@ document.addEventListener('DOMContentLoaded', function () {
             
             <div style="margin-top: 15px; display: flex; flex-wrap: wrap; gap: 8px;">
               ${
-                product.attributes?.color
-                  ? `<span style="background: #f0f0f0; color: #555; font-size: 0.8rem; padding: 4px 10px; border-radius: 20px;">${product.attributes.color}</span>`
+                product.attributes?.color_name || product.attributes?.color
+                  ? `<span style="background: #f0f0f0; color: #555; font-size: 0.8rem; padding: 4px 10px; border-radius: 20px;">${product.attributes.color_name || product.attributes.color}</span>`
                   : ''
               }
               ${
@@ -520,8 +565,13 @@ document.addEventListener('DOMContentLoaded', function () {
                   ? `<span style="background: #f0f0f0; color: #555; font-size: 0.8rem; padding: 4px 10px; border-radius: 20px;">${product.attributes.style}</span>`
                   : ''
               }
+              ${
+                product.colors && product.colors.length > 1
+                  ? `<span style="background: #f0f0f0; color: #555; font-size: 0.8rem; padding: 4px 10px; border-radius: 20px;">${product.colors.length} colors</span>`
+                  : ''
+              }
             </div>
-            
+
             ${
               product.availability
                 ? `<p style="font-size: 0.85rem; margin-top: 10px; color: ${
@@ -537,89 +587,75 @@ document.addEventListener('DOMContentLoaded', function () {
     });
 
     // Show no results message if needed
-    if (validProducts.length === 0) {
+    if (!append && validProducts.length === 0) {
       noResults.style.display = 'block';
     }
   }
 
-  function createFilters(products) {
+  // Display names of facet values that don't read well capitalized
+  const FACET_LABELS = { hm: 'H&M' };
+
+  function facetLabel(value) {
+    return FACET_LABELS[value] || value.charAt(0).toUpperCase() + value.slice(1);
+  }
+
+  function createFilters(facets) {
     // Clear existing filters
     filterContainer.innerHTML = '';
 
     // Add "All" filter
-    addFilter('All', true);
-
-    // Collect unique values for different attributes
-    const colors = new Set();
-    const lengths = new Set();
-    const retailers = new Set();
-    const clothingTypes = new Set();
-
-    products.forEach((product) => {
-      // Track retailers for filtering
-      if (product.retailer) {
-        retailers.add(product.retailer.toLowerCase());
-      }
+    addFilter('All', null, null, true);
 
-      if (product.attributes) {
-        if (product.attributes.color) {
-          colors.add(product.attributes.color.toLowerCase());
-        }
-        if (product.attributes.length) {
-          lengths.add(product.attributes.length.toLowerCase());
-        }
-        // Track clothing types
-        if (product.attributes.clothing_type) {
-          clothingTypes.add(product.attributes.clothing_type.toLowerCase());
-        }
-      }
-    });
-    // Check if there are skirts or dresses in the product collection
-    const hasSkirtsOrDresses = Array.from(clothingTypes).some(
-      (type) => type.includes('skirt') || type.includes('dress')
-    );
-
-    // Add retailer filters
-    if (retailers.size > 0) {
-      retailers.forEach((retailer) => {
-        const capitalizedRetailer =
-          retailer.charAt(0).toUpperCase() + retailer.slice(1);
-        addFilter(capitalizedRetailer);
-      });
-    }
+    // Values that say nothing about the product aren't worth a filter
+    const skipped = { color: 'unknown', length: 'standard' };
 
-    // Only add length filters if there are skirts or dresses
-    if (hasSkirtsOrDresses) {
-      ['mini', 'midi', 'maxi'].forEach((length) => {
-        if (lengths.has(length)) {
-          const capitalizedLength =
-            length.charAt(0).toUpperCase() + length.slice(1);
-          addFilter(capitalizedLength);
+    ['retailer', 'length', 'color'].forEach((facet) => {
+      Object.entries(facets[facet] || {}).forEach(([value, count]) => {
+        if (value !== skipped[facet]) {
+          addFilter(`${facetLabel(value)} (${count})`, facet, value);
         }
       });
-    }
-    // // Add length filters (mini, midi, maxi)
-    // ['mini', 'midi', 'maxi'].forEach((length) => {
-    //   if (lengths.has(length)) {
-    //     const capitalizedLength =
-    //       length.charAt(0).toUpperCase() + length.slice(1);
-    //     addFilter(capitalizedLength);
-    //   }
-    // });
-
-    // Add color filters
-    if (colors.has('black')) {
-      addFilter('Black');
-    }
+    });
+
+    // Price buckets, e.g. "25-50"
+    Object.entries(facets.price || {}).forEach(([bucket, count]) => {
+      addFilter(`${bucket} (${count})`, 'price', bucket);
+    });
+  }
+
+  // Fetch a page of the current results matching a facet filter; with a
+  // cursor the page is added below the products already shown
+  function fetchResults(params, cursor = null) {
+    if (!currentResultId) return;
 
-    // Add "Colored" filter if there are non-black colors
-    if (colors.size > 1 || (colors.size === 1 && !colors.has('black'))) {
-      addFilter('Colored');
+    const query = new URLSearchParams({ ...params, thumb_width: thumbWidth() });
+    if (cursor) {
+      query.set('cursor', cursor);
     }
+    loadMoreButton.disabled = true;
+    fetch(`${backendBase}/results/${currentResultId}?${query}`, { mode: 'cors' })
+      .then((response) =>
+        response.json().then((data) => {
+          if (!response.ok || data.status === false) {
+            throw new Error(data.message || 'Failed to load results');
+          }
+          return data;
+        })
+      )
+      .then((data) => {
+        noResults.style.display = 'none';
+        displayProducts(data.items || [], Boolean(cursor));
+        setNextCursor(data.next_cursor);
+      })
+      .catch((error) => {
+        showError(error.message || 'An error occurred');
+      })
+      .finally(() => {
+        loadMoreButton.disabled = false;
+      });
   }
 
-  //
-  function addFilter(text, isActive = false) {
+  function addFilter(text, facet, value, isActive = false) {
     const button = document.createElement('button');
     button.className = 'filter-button' + (isActive ? ' active' : '');
     button.textContent = text;
@@ -631,91 +667,9 @@ document.addEventListener('DOMContentLoaded', function () {
       });
       this.classList.add('active');
 
-      // Apply filter
-      const filterValue = this.textContent.trim().toLowerCase();
-      const cards = document.querySelectorAll('.product-card');
-
-      cards.forEach((card) => {
-        // Show all if "All" is selected
-        if (filterValue === 'all') {
-          card.style.display = 'block';
-          return;
-        }
-
-        // Filter by retailer (Zara, H&M)
-        if (
-          filterValue === 'zara' ||
-          filterValue === 'h&m' ||
-          filterValue === 'hm'
-        ) {
-          // Since we don't have data-retailer attributes, look for the retailer text in the card
-          const retailerDiv = card.querySelector(
-            'div[style*="position: absolute"]'
-          );
-          const retailerText = retailerDiv
-            ? retailerDiv.textContent.trim().toLowerCase()
-            : '';
-
-          // Handle 'h&m' vs 'hm' check
-          if (
-            (filterValue === 'h&m' || filterValue === 'hm') &&
-            (retailerText === 'h&m' || retailerText === 'hm')
-          ) {
-            card.style.display = 'block';
-          } else if (retailerText === filterValue) {
-            card.style.display = 'block';
-          } else {
-            card.style.display = 'none';
-          }
-          return;
-        }
-
-        // Filter by length
-        if (
-          filterValue === 'mini' ||
-          filterValue === 'midi' ||
-          filterValue === 'maxi'
-        ) {
-          if (
-            card.getAttribute('data-length') &&
-            card.getAttribute('data-length').includes(filterValue)
-          ) {
-            card.style.display = 'block';
-          } else {
-            card.style.display = 'none';
-          }
-          return;
-        }
-
-        // Filter by color
-        if (filterValue === 'black') {
-          if (
-            card.getAttribute('data-color') &&
-            card.getAttribute('data-color').includes('black')
-          ) {
-            card.style.display = 'block';
-          } else {
-            card.style.display = 'none';
-          }
-          return;
-        }
-
-        // Show all non-black for "Colored" filter
-        if (filterValue === 'colored') {
-          if (
-            card.getAttribute('data-color') &&
-            !card.getAttribute('data-color').includes('black')
-          ) {
-            card.style.display = 'block';
-          } else {
-            card.style.display = 'none';
-          }
-          return;
-        }
-
-        // If we're here, the filter didn't match any category
-        card.style.display = 'none';
-      });
+      // The server filters, so only the first page of matching products is sent
+      currentFilter = facet ? { [facet]: value } : {};
+      fetchResults(currentFilter);
     });
 
     filterContainer.appendChild(button);
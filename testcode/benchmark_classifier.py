@@ -0,0 +1,107 @@
+"""
+Microbenchmark: per-product cost of tagging color, length, material and size.
+
+Compares the old per-attribute keyword loops (rebuilt lists, repeated `in`
+scans, uncompiled re.search) with the shared single-pass classifier, both
+uncached and with the classifier's text cache warm.
+
+Run from the repository root:
+    python testcode/benchmark_classifier.py
+"""
+
+import os
+import re
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from scraping.classifier import classify
+
+#########################
+# PREVIOUS IMPLEMENTATION
+#########################
+
+def legacy_color(text):
+    text = text.lower()
+    colors = ['black', 'white', 'red', 'blue', 'green', 'yellow', 'purple', 'pink',
+              'orange', 'brown', 'gray', 'grey', 'beige', 'navy', 'teal', 'cream',
+              'anthracite', 'ivory', 'silver', 'gold', 'burgundy', 'maroon', 'olive']
+    for color in colors:
+        if color in text:
+            return color.capitalize()
+    return "Unknown"
+
+def legacy_length(text):
+    text = text.lower()
+    length_terms = {
+        'mini': ['mini', 'short'],
+        'midi': ['midi', 'medium', 'mid-length', 'mid length', 'mid-level'],
+        'maxi': ['maxi', 'long', 'full-length', 'full length', 'floor-length'],
+        'knee-length': ['knee', 'knee-length', 'knee length']
+    }
+    for length_type, terms in length_terms.items():
+        for term in terms:
+            if term in text:
+                return length_type
+    return "Standard"
+
+def legacy_material(text):
+    materials = ['cotton', 'polyester', 'linen', 'wool', 'silk', 'viscose', 'nylon',
+                 'elastane', 'spandex', 'rayon', 'acrylic', 'cashmere', 'modal']
+    text = text.lower()
+    return ", ".join(material.capitalize() for material in materials if material in text)
+
+def legacy_size(text):
+    size_patterns = [
+        r'\b(size|sz)[:\s]+([XS|S|M|L|XL|XXL|XXXL|0-9]+)',
+        r'\b(US|EU)[:\s]*([0-9]+)',
+    ]
+    for pattern in size_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(2)
+    return "Standard"
+
+def legacy_tag(text):
+    return legacy_color(text), legacy_length(text), legacy_material(text), legacy_size(text)
+
+#########################
+# BENCHMARK
+#########################
+
+WORDS = ["textured", "pleated", "flared", "satin", "wrap", "dress", "skirt", "top", "blouse",
+         "with", "belt", "buttons", "ruffled", "oversize", "limited", "edition", "ZW", "collection"]
+ATTRIBUTES = ["black", "navy", "ivory", "midi", "mini", "long", "knee-length", "linen", "wool blend",
+              "cotton", "size: M", "EU 38", ""]
+
+def make_names(count, seed=7):
+    """Product names shaped like real search results"""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.sample(WORDS, 4) + rng.sample(ATTRIBUTES, 2)).strip().upper()
+        for _ in range(count)
+    ]
+
+def per_product_us(tag, names, repeat=5):
+    """Best-of-repeat microseconds per product for tagging every name"""
+    def run():
+        for name in names:
+            tag(name)
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(names) * 1e6
+
+def uncached_classify(text):
+    return classify.__wrapped__(text)
+
+if __name__ == "__main__":
+    names = make_names(5000)
+    legacy = per_product_us(legacy_tag, names)
+    single_pass = per_product_us(uncached_classify, names)
+    classify.cache_clear()
+    per_product_us(classify, names, repeat=1)
+    cached = per_product_us(classify, names)
+
+    print(f"{len(names)} product names, color + length + material + size")
+    print(f"  keyword loops:         {legacy:6.2f} us/product")
+    print(f"  single-pass classify:  {single_pass:6.2f} us/product ({legacy / single_pass:.1f}x)")
+    print(f"  cached classify:       {cached:6.2f} us/product ({legacy / cached:.1f}x)")